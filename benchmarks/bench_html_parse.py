@@ -0,0 +1,79 @@
+"""
+    Benchmark for HtmlCleaner.extract_html_from_file() on the test html of tests/test_clean_html.py, scaled up to
+    chapter size in a page with a style sheet, scripts, a navigation with a table of contents, a header and a
+    footer. Parsing only the content element with a SoupStrainer and pruning scripts, styles and navigation is
+    compared to parsing the whole page before finding the content element, as before. Parse time and peak memory
+    (measured with tracemalloc) are given for the parsing alone and for all of clean_html().
+
+    Run from the repository root:
+    $ python benchmarks/bench_html_parse.py
+"""
+import os
+import tempfile
+
+from bs4 import BeautifulSoup
+
+from common import PARAGRAPH, measure
+from text_cleaner.clean_html import HtmlCleaner, tidy_up_text_format
+
+TOC_ENTRY = '<li class="toc-entry"><a href="#hix{0}" class="toc-link"><span class="toc-number">{0}</span>' \
+            '<span class="toc-title">Kafli {0}</span></a></li>'
+SCRIPT = '<script>function highlight(id) {{ document.getElementById(id).classList.add("active"); }} ' \
+         'var sentences = [{}];</script>'
+STYLE = '<style>.sentence {{ color: black; }} .active {{ background: yellow; }} {}</style>'
+PARAGRAPHS = [100, 1000, 3000]
+RUNS = 3
+
+
+def page(paragraphs: int) -> str:
+    sentence_ids = ','.join('"qitl_{}a"'.format(i) for i in range(paragraphs))
+    rules = ' '.join('#hix{} {{ margin: 0; }}'.format(i) for i in range(paragraphs))
+    toc = ''.join(TOC_ENTRY.format(i) for i in range(paragraphs))
+    body = ''.join(PARAGRAPH.format(i) for i in range(paragraphs))
+    return '<html><head>' + STYLE.format(rules) + SCRIPT.format(sentence_ids) + '</head><body>' \
+           '<header><h1>Bókin</h1></header><nav><ol>' + toc + '</ol></nav>' \
+           '<div class="content-text">' + body + '</div>' \
+           '<footer><p>Höfundarréttur</p></footer>' + SCRIPT.format(sentence_ids) + '</body></html>'
+
+
+def parse_whole_page(cleaner, html_doc):
+    """
+    The previous implementation: the whole page is parsed, then the content element is looked up.
+    """
+    with open(html_doc) as html_doc_content:
+        soup = BeautifulSoup(html_doc_content, features='html.parser')
+    return soup.find(cleaner.top_elem, cleaner.content_parent_div)
+
+
+def clean_whole_page(cleaner, html_doc):
+    soup = parse_whole_page(cleaner, html_doc)
+    soup = cleaner.clean_html_tables(soup)
+    soup = cleaner.append_punctuation_to_tag_content(soup)
+    return tidy_up_text_format(soup.get_text())
+
+
+def main():
+    cleaner = HtmlCleaner()
+    print('{:>10} {:>10} {:>24} {:>24}'.format('paragraphs', 'size (KB)', 'parse (ms / MB)', 'clean_html (ms / MB)'))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        html_doc = os.path.join(tmp_dir, 'chapter.html')
+        for paragraphs in PARAGRAPHS:
+            html = page(paragraphs)
+            with open(html_doc, 'w') as html_file:
+                html_file.write(html)
+            assert clean_whole_page(cleaner, html_doc) == cleaner.clean_html(html_doc, from_file=True)
+            results = [
+                ('whole page', measure(lambda: parse_whole_page(cleaner, html_doc), RUNS)[:2],
+                 measure(lambda: clean_whole_page(cleaner, html_doc), RUNS)[:2]),
+                ('content only',
+                 measure(lambda: cleaner.prune_elements(cleaner.extract_html_from_file(html_doc)), RUNS)[:2],
+                 measure(lambda: cleaner.clean_html(html_doc, from_file=True), RUNS)[:2]),
+            ]
+            for name, (parse_time, parse_peak), (clean_time, clean_peak) in results:
+                print('{:>10} {:>10} {:>13.1f} / {:8.1f} {:>13.1f} / {:8.1f}  ({})'.format(
+                    paragraphs, len(html.encode('utf-8')) // 1024, parse_time * 1000, parse_peak,
+                    clean_time * 1000, clean_peak, name))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+    Benchmark for reading html files with HtmlCleaner: a large chapter built from the test html of
+    tests/test_clean_html.py, encoded in windows-1252 as declared in its <meta> charset, is decoded with the
+    encoding detected by detect_encoding() from its first bytes, read or memory-mapped (read_html()), compared to
+    BeautifulSoup's own detection of the encoding of the bytes (UnicodeDammit). Time and peak memory (measured with
+    tracemalloc, which does not count the pages of a memory-mapped file) are given for each.
+
+    Run from the repository root:
+    $ python benchmarks/bench_html_read.py
+"""
+import os
+import tempfile
+
+from bs4 import UnicodeDammit
+
+from common import chapter, measure
+from text_cleaner.clean_html import read_html
+
+PARAGRAPHS = 70000
+
+
+def read_dammit(html_doc: str) -> str:
+    with open(html_doc, 'rb') as html_file:
+        return UnicodeDammit(html_file.read(), is_html=True).unicode_markup
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        html_doc = os.path.join(tmp_dir, 'chapter.html')
+        with open(html_doc, 'wb') as html_file:
+            html_file.write(chapter(PARAGRAPHS, head='<meta charset="windows-1252">').encode('cp1252'))
+        print('chapter of {:.1f} MB'.format(os.path.getsize(html_doc) / 1e6))
+        print('{:>36} {:>10} {:>10}'.format('', 'time (s)', 'peak (MB)'))
+        results = [
+            ('UnicodeDammit', measure(lambda: read_dammit(html_doc))),
+            ('read_html(), read', measure(lambda: read_html(html_doc, use_mmap=False))),
+            ('read_html(), memory-mapped', measure(lambda: read_html(html_doc, use_mmap=True))),
+        ]
+        for name, (seconds, peak, text) in results:
+            assert text == results[1][1][2]
+            print('{:>36} {:10.3f} {:10.1f}'.format(name, seconds, peak))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+    Benchmark for HtmlCleaner.append_punctuation_to_tag_content() on a large EPUB chapter: the tag replacements
+    are appended in one walk over the tree, compared to one find_all() per entry of the replacement map as
+    before. Both versions are checked to produce the same text.
+
+    Run from the repository root:
+    $ python benchmarks/bench_html_tags.py
+"""
+import time
+
+from bs4 import BeautifulSoup
+
+from text_cleaner.clean_html import HtmlCleaner
+
+SECTION = '<h2>Kafli {0}</h2>' \
+          '<p id="p{0}"><span id="s{0}a" class="sentence">Í kjölfarið sýndi hann fram á að það stuðli að ' \
+          'heilbrigði ef einstaklingar geti fundið <strong>samhengi</strong> í tengslum við lífsatburði. </span>' \
+          '<span id="s{0}b" class="sentence">Hann taldi uppsprettu heilbrigðis (e. </span><em>' \
+          '<span id="s{0}c" class="sentence">salutogenesis)</span></em> vera að finna í ' \
+          '<a href="#n{0}">hæfni</a> einstaklinga.<br/></p>' \
+          '<ul><li>Fyrsta atriði</li><li>Annað atriði<ol><li>undirliður</li></ol></li></ul>' \
+          '<dl><dt>Hugtak</dt><dd>Skilgreining hugtaksins</dd></dl>' \
+          '<table><tr><th>Ár</th><th>Fjöldi</th></tr><tr><td>2020</td><td>15</td></tr></table><hr/>'
+SECTIONS = [100, 1000, 3000]
+RUNS = 3
+
+
+def chapter(sections: int) -> str:
+    body = ''.join(SECTION.format(i) for i in range(sections))
+    return '<html><body><div class="content-text">' + body + '</div></body></html>'
+
+
+def append_per_tag(cleaner, text_tag):
+    """
+    The previous implementation: one traversal of the tree per tag in the replacement map.
+    """
+    for tag in cleaner.tag_replacements:
+        for text_within_tag in text_tag.find_all(tag):
+            text_within_tag.append(' ' + cleaner.tag_replacements[tag] + ' ')
+    return text_tag
+
+
+def time_append(append, cleaner, html: str):
+    timings = []
+    for _ in range(RUNS):
+        soup = BeautifulSoup(html, features='html.parser')
+        start = time.perf_counter()
+        append(soup)
+        timings.append(time.perf_counter() - start)
+    return min(timings), soup.get_text()
+
+
+def main():
+    cleaner = HtmlCleaner()
+    print('{:>10} {:>10} {:>14} {:>14}'.format('sections', 'size (KB)', 'per tag (ms)', 'one walk (ms)'))
+    for sections in SECTIONS:
+        html = chapter(sections)
+        per_tag, per_tag_text = time_append(lambda soup: append_per_tag(cleaner, soup), cleaner, html)
+        one_walk, one_walk_text = time_append(cleaner.append_punctuation_to_tag_content, cleaner, html)
+        assert per_tag_text == one_walk_text
+        print('{:>10} {:>10} {:14.1f} {:14.1f}'.format(sections, len(html.encode('utf-8')) // 1024,
+                                                       per_tag * 1000, one_walk * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+    Import time benchmark for the lazily loaded text_cleaner package. Each statement is run in a fresh
+    interpreter, the time of an empty interpreter run is subtracted. The last statement loads everything,
+    as 'import text_cleaner' did before the package was loaded lazily.
+
+    Run from the repository root:
+    $ python benchmarks/bench_import.py
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 20
+STATEMENTS = [
+    'import text_cleaner',
+    'from text_cleaner import TextCleaner',
+    'from text_cleaner import TextCleaner; TextCleaner().clean("halló heimur")',
+    'from text_cleaner import HtmlCleaner',
+    'import text_cleaner.clean, text_cleaner.clean_html, text_cleaner.emoji_dictionary',
+]
+
+
+def time_statement(statement: str) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', statement], check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    interpreter = time_statement('pass')
+    print('interpreter startup: {:.1f} ms'.format(interpreter * 1000))
+    for statement in STATEMENTS:
+        print('{:8.1f} ms  {}'.format((time_statement(statement) - interpreter) * 1000, statement))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+    Benchmark for CleaningPipeline on a chapter of the test html of tests/test_clean_html.py: the text extracted
+    by HtmlCleaner is streamed into TextCleaner, compared to cleaning the whole text returned by
+    HtmlCleaner.clean_html() and by the joined HtmlCleaner.iter_clean_html(). Time and peak memory (measured
+    with tracemalloc) are given for each, and for the pipeline writing the cleaned text to a file as it comes,
+    without the text of the whole chapter in memory.
+
+    Run from the repository root:
+    $ python benchmarks/bench_pipeline.py
+"""
+import os
+import tempfile
+
+from common import chapter, measure
+from text_cleaner import unicode_maps
+from text_cleaner.clean import TextCleaner
+from text_cleaner.clean_html import HtmlCleaner
+from text_cleaner.pipeline import CleaningPipeline
+
+PARAGRAPHS = 5000
+
+
+def write_cleaned(pipeline, html_doc: str, text_doc: str) -> str:
+    with open(text_doc, 'w') as text_file:
+        for text in pipeline.iter_clean(html_doc, from_file=True):
+            text_file.write(text)
+    with open(text_doc) as text_file:
+        return text_file.read()
+
+
+def main():
+    html_cleaner = HtmlCleaner()
+    text_cleaner = TextCleaner(replacement_dict=unicode_maps.replacement_dictionary,
+                               post_dict=unicode_maps.post_dict_lookup)
+    pipeline = CleaningPipeline(html_cleaner, text_cleaner)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        html_doc = os.path.join(tmp_dir, 'chapter.html')
+        text_doc = os.path.join(tmp_dir, 'chapter.txt')
+        with open(html_doc, 'w') as html_file:
+            html_file.write(chapter(PARAGRAPHS))
+        print('chapter of {} KB'.format(os.path.getsize(html_doc) // 1024))
+        print('{:>32} {:>10} {:>10}'.format('', 'time (s)', 'peak (MB)'))
+        results = [
+            ('clean(clean_html())', measure(
+                lambda: text_cleaner.clean(html_cleaner.clean_html(html_doc, from_file=True)))),
+            ('clean(join(iter_clean_html()))', measure(
+                lambda: text_cleaner.clean(''.join(html_cleaner.iter_clean_html(html_doc, from_file=True))))),
+            ('pipeline.clean()', measure(lambda: pipeline.clean(html_doc, from_file=True))),
+            ('pipeline.iter_clean() to file', measure(lambda: write_cleaned(pipeline, html_doc, text_doc))),
+        ]
+        for name, (seconds, peak, text) in results:
+            assert text == results[0][1][2]
+            print('{:>32} {:10.2f} {:10.1f}'.format(name, seconds, peak))
+
+
+if __name__ == '__main__':
+    main()
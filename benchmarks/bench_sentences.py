@@ -0,0 +1,69 @@
+"""
+    Benchmark for TextCleaner.iter_sentences() on a text streamed in chunks of 64 characters, as from a text
+    generator or a network stream: the time to the first cleaned sentence, from which speech synthesis can start, is
+    compared to that of clean() of the whole text once it has arrived and to the first piece of iter_clean(). The
+    number of characters fed before the first output and the total time are given for each, and the joined
+    outputs are checked to be the same.
+
+    Run from the repository root:
+    $ python benchmarks/bench_sentences.py
+"""
+import time
+
+from common import TEXT_PARAGRAPH
+from text_cleaner import unicode_maps
+from text_cleaner.clean import TextCleaner
+
+PARAGRAPHS = 2000
+CHUNK_SIZE = 64
+
+
+def chunks(text: str):
+    for start in range(0, len(text), CHUNK_SIZE):
+        yield text[start:start + CHUNK_SIZE]
+
+
+def clean_whole(cleaner, texts):
+    # nothing can be cleaned before the whole text has arrived
+    yield cleaner.clean(''.join(texts))
+
+
+def measure_stream(outputs, fed: list):
+    """
+    Return the time to the first output, the characters fed until then, the total time and the joined outputs.
+    """
+    start = time.perf_counter()
+    first = None
+    joined = []
+    for text in outputs:
+        if first is None:
+            first = time.perf_counter() - start, sum(fed)
+        joined.append(text)
+    return first[0], first[1], time.perf_counter() - start, ''.join(joined)
+
+
+def counted(texts, fed: list):
+    for text in texts:
+        fed.append(len(text))
+        yield text
+
+
+def main():
+    cleaner = TextCleaner(replacement_dict=unicode_maps.replacement_dictionary,
+                          post_dict=unicode_maps.post_dict_lookup)
+    text = TEXT_PARAGRAPH * PARAGRAPHS
+    print('text of {} KB in chunks of {} characters'.format(len(text.encode('utf-8')) // 1024, CHUNK_SIZE))
+    print('{:>20} {:>16} {:>12} {:>14}'.format('', 'first (ms)', 'chars fed', 'total (s)'))
+    results = []
+    for name, stream in [('clean()', lambda texts: clean_whole(cleaner, texts)),
+                         ('iter_clean()', cleaner.iter_clean),
+                         ('iter_sentences()', cleaner.iter_sentences)]:
+        fed = []
+        results.append((name, measure_stream(stream(counted(chunks(text), fed)), fed)))
+    for name, (first, fed, total, cleaned) in results:
+        assert cleaned == results[0][1][3]
+        print('{:>20} {:16.3f} {:12} {:14.2f}'.format(name, first * 1000, fed, total))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+    Adversarial benchmark for clean_html.tidy_up_text_format(): the time per character should stay the same
+    from 10 KB to 1 MB of input for each of the inputs below, all of them on one line, as in a chapter without
+    line breaks. For comparison, the regular expressions used before are timed on small inputs, their
+    backtracking on lines containing "http" takes cubic time and gets out of hand beyond 1 KB.
+
+    Run from the repository root:
+    $ python benchmarks/bench_tidy_up.py
+"""
+import re
+import time
+
+from text_cleaner.clean_html import tidy_up_text_format
+
+PUNCTUATION = '[,.:;?!]'
+URL_PATTERN = '^(www)|(http).*'
+SIZES = [10000, 100000, 1000000]
+LEGACY_SIZES = [250, 500, 1000]
+INPUTS = {
+    'prose': 'Hann Bubbi söng afmælissönginn fyrir frænda sinn, á sunnudaginn.  Veislan var haldin í Hörpu. ',
+    'http without end': 'http://mbl.is/frett/2021 ',
+    'http, then end': 'http://mbl.is/frett/2021 a.b, ',
+    'punctuation': '. , ; ! ? : ',
+    'spaced punctuation': '.        x ',
+    'www': 'www.',
+}
+
+
+def legacy_tidy_up_text_format(text):
+    text = text.replace('\\s\n', '\n')
+    text = re.sub(r'\n+', '\n', text).strip()
+    text = re.sub(' +', ' ', text)
+    text = re.sub(r'(' + PUNCTUATION + ')' + r'(\s*' + PUNCTUATION + ')+', r'\1', text)
+    return re.sub(r'(' + URL_PATTERN + r')(.*)([.,])+([\s\n])', r'\1\2 \3 ', text)
+
+
+def repeat_pattern(pattern: str, size: int) -> str:
+    return (pattern * (size // len(pattern) + 1))[:size]
+
+
+def time_tidy_up(tidy_up, text: str) -> float:
+    repeat = max(1, 100000 // len(text))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        tidy_up(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    print('{:>20} {:>10} {:>14}'.format('input', 'size', 'ns/char'))
+    for name, pattern in INPUTS.items():
+        for size in LEGACY_SIZES:
+            legacy = time_tidy_up(legacy_tidy_up_text_format, repeat_pattern(pattern, size)) / size * 1e9
+            print('{:>20} {:>10} {:14.1f}  (legacy)'.format(name, size, legacy))
+        for size in SIZES:
+            tidy_up = time_tidy_up(tidy_up_text_format, repeat_pattern(pattern, size)) / size * 1e9
+            print('{:>20} {:>10} {:14.1f}'.format(name, size, tidy_up))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+    Scaling benchmark for TextCleaner.text_to_tokens(): the throughput per character should stay the same
+    from 1 KB to 10 MB of input. For comparison, the lookahead regex used before is timed up to 100 KB,
+    beyond that its quadratic runtime gets out of hand.
+
+    Run from the repository root:
+    $ python benchmarks/bench_tokenizer.py
+"""
+import re
+import time
+
+from text_cleaner.clean import TextCleaner
+
+PARAGRAPH = 'Hann Bubbi söng afmælissönginn fyrir frænda sinn á sunnudaginn. Veislan var haldin í ' \
+            'Hörpu og gestirnir skemmtu sér vel fram eftir kvöldi, allt til miðnættis. '
+PARAGRAPH_WITH_PARENTHESES = 'Hann taldi uppsprettu heilbrigðis (e. salutogenesis) vera að finna í ' \
+                             'mismunandi hæfni einstaklinga (sjá kafla 3) til að stjórna viðbrögðum sínum. '
+SIZES = [1000, 10000, 100000, 1000000, 10000000]
+LEGACY_MAX_SIZE = 100000
+
+
+def legacy_text_to_tokens(text: str) -> list:
+    return re.split(r'\s(?![^(]*\))', text)
+
+
+def time_tokenizer(tokenizer, text: str) -> float:
+    repeat = max(1, 1000000 // len(text))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        tokenizer(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    print('{:>10} {:>14} {:>14} {:>14}'.format('size', 'paragraph', 'parentheses', 'legacy'))
+    print('{:>10} {:>14} {:>14} {:>14}'.format('(chars)', '(ns/char)', '(ns/char)', '(ns/char)'))
+    for size in SIZES:
+        text = (PARAGRAPH * (size // len(PARAGRAPH) + 1))[:size]
+        text_with_parentheses = (PARAGRAPH_WITH_PARENTHESES * (size // len(PARAGRAPH_WITH_PARENTHESES) + 1))[:size]
+        plain = time_tokenizer(TextCleaner.text_to_tokens, text) / size * 1e9
+        parentheses = time_tokenizer(TextCleaner.text_to_tokens, text_with_parentheses) / size * 1e9
+        if size <= LEGACY_MAX_SIZE:
+            legacy = '{:14.1f}'.format(time_tokenizer(legacy_text_to_tokens, text) / size * 1e9)
+        else:
+            legacy = '{:>14}'.format('-')
+        print('{:>10} {:14.1f} {:14.1f} {}'.format(size, plain, parentheses, legacy))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+    Test documents and measurements shared by the benchmarks: a paragraph of the test html of
+    tests/test_clean_html.py and of the test text of tests/test_clean.py, chapters built from the html paragraph,
+    and the time and peak memory of a function.
+"""
+import time
+import tracemalloc
+
+PARAGRAPH = '<p id="hix{0}"><span id="qitl_{0}a" class="sentence">Í kjölfarið sýndi hann fram á að það stuðli að ' \
+            'heilbrigði ef einstaklingar geti fundið samhengi í tengslum við lífsatburði eða öðlast skilning á ' \
+            'aðstæðum sínum. </span><span id="qitl_{0}b" class="sentence">Hann taldi uppsprettu heilbrigðis ' \
+            '(e. </span><em><span id="qitl_{0}c" class="sentence">salutogenesis)</span></em>' \
+            '<span id="qitl_{0}d" class="sentence"> vera að finna í mismunandi hæfni einstaklinga til að stjórna ' \
+            'viðbrögðum sínum við álagi. </span></p>'
+TEXT_PARAGRAPH = 'Í kjölfarið sýndi hann fram á að það stuðli að heilbrigði ef einstaklingar geti fundið samhengi í ' \
+                 'tengslum við lífsatburði eða öðlast skilning á aðstæðum sínum. Hann taldi uppsprettu heilbrigðis ' \
+                 '(e. salutogenesis) vera að finna í mismunandi hæfni einstaklinga til að stjórna viðbrögðum sínum ' \
+                 'við álagi, t.d. í vinnu. Þann 4. maí 😎 var fundur. '
+
+
+def chapter(paragraphs: int, head='') -> str:
+    """
+    Return an html page of 'paragraphs' paragraphs of PARAGRAPH in its content element, with 'head' in its head.
+    """
+    body = ''.join(PARAGRAPH.format(i) for i in range(paragraphs))
+    return '<html><head>' + head + '</head><body><div class="content-text">' + body + '</div></body></html>'
+
+
+def measure(function, runs=1):
+    """
+    Return the best time of 'runs' calls of 'function', and its peak memory in MB (measured with tracemalloc) and
+    its result in one more call.
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak / 1e6, result
@@ -12,7 +12,7 @@ setup(
 		'setuptools',
 		'bs4'
 	],
-	python_requires='>=3.5',
+	python_requires='>=3.7',
 	entry_points={
 			'console_scripts': [
 				'text_cleaner=text_cleaner.clean:main'
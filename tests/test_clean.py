@@ -1,6 +1,10 @@
 # This Python file uses the following encoding: utf-8
+import io
+import itertools
+import re
 from text_cleaner import *
 import text_cleaner.unicode_maps as umaps
+from text_cleaner import emoji_matcher
 
 
 def test_default_clean():
@@ -51,6 +55,93 @@ def test_clean_emoji():
     assert cleaner.clean("🔥") == "fire"
     assert cleaner.clean("a 🧹 is used to play quidditch") == "a broom is used to play kuidditkh"
 
+def test_emoji_sequences():
+    # emoji sequences are matched as a whole, not as a sequence of their parts
+    cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup, describe_emojis=True)
+    assert cleaner.clean("👍🏽") == "thumbs up: medium skin tone"
+    cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup)
+    assert cleaner.clean("góður 👍🏽 dagur") == "góður . dagur"
+    assert cleaner.clean("1️⃣ 2") == ". 2"
+
+def test_emoji_prefilter():
+    cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup)
+    assert cleaner.clean("engin tákn hér 123") == "engin tákn hér 123"
+    assert cleaner.emoji_fast_path_count == 1
+    assert cleaner.emoji_scan_count == 0
+    assert cleaner.clean("eitt tákn 😎") == "eitt tákn ."
+    assert cleaner.emoji_fast_path_count == 1
+    assert cleaner.emoji_scan_count == 1
+    # the check without the emoji dictionary covers all of its emojis
+    matcher = emoji_matcher.get_default_matcher()
+    assert all(emoji_matcher.may_contain_emoji(char) for char in matcher.required_codepoints)
+    assert not emoji_matcher.may_contain_emoji("Græn­lands­haf ß Ø π")
+
+def test_clean_batch():
+    cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup)
+    texts = ["π námundast í 3.14", "📌 red pin", "", "  ß Ø  ", "(hello).", "Græn­lands­haf snemma í morg­un.", "a\x00b"]
+    assert cleaner.clean_batch(texts) == [cleaner.clean(text) for text in texts]
+    assert cleaner.clean_batch(iter(texts[:-1])) == [cleaner.clean(text) for text in texts[:-1]]
+    assert cleaner.clean_batch([]) == []
+
+def test_clean_parallel():
+    cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup)
+    texts = ["π námundast í " + str(i) for i in range(100)] + ["📌 red pin", "", "ß Ø"]
+    for workers in [1, 2]:
+        cleaned = clean_parallel(texts, workers=workers, chunksize=7,
+                                 replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup)
+        assert list(cleaned) == [cleaner.clean(text) for text in texts]
+
+def test_iter_clean():
+    cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup)
+    text = "Hann taldi uppsprettu heilbrigðis (e. salutogenesis) vera 😎 að finna.\nπ námundast (hello). í 3.14 "
+    for size in [1, 5, 1000]:
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert ''.join(cleaner.iter_clean(chunks)) == cleaner.clean(text)
+    assert len(list(cleaner.iter_clean([text[:40], text[40:]]))) > 1
+    assert ''.join(cleaner.iter_clean(['ab'] * 1000 + [' c'])) == cleaner.clean('ab' * 1000 + ' c')
+
+def test_sentence_emitter():
+    cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup)
+    text = "Sjá t.d. bls. 5. Hann taldi uppsprettu heilbrigðis (e. Salutogenesis. Sjá) vera 😎 að finna, sagði " \
+           "hann. Þann 4. maí? Já."
+    emitter = SentenceEmitter(cleaner)
+    # the first sentence is emitted once the text up to the next parenthesis is known to split into tokens,
+    # as it opens one, and the word after the sentence is complete
+    assert [emitter.feed(c) for c in text[:54]] == [[]] * 54
+    assert emitter.feed(text[54]) == ['Sjá t.d. bls. 5. ']
+    # no sentence ends within the parenthesis, nor before the end of the text without a parenthesis after it
+    assert emitter.feed(text[55:]) == []
+    assert emitter.flush() == ['Hann taldi uppsprettu heilbrigðis (e. Salutogenesis. Sjá) vera . að finna, '
+                               'sagði hann. ', 'Þann 4. maí? ', 'Já.']
+    clauses = list(cleaner.iter_sentences([text], min_clause_words=4))
+    assert clauses[1:3] == ['Hann taldi uppsprettu heilbrigðis (e. Salutogenesis. Sjá) vera . að finna, ',
+                            'sagði hann. ']
+    for size in [1, 5, 1000]:
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert ''.join(cleaner.iter_sentences(chunks)) == cleaner.clean(text)
+
+def test_unclosed_parenthesis():
+    cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup)
+    text = "Hann taldi (e. salutogenesis " + "vera að finna. Sjá bls. 5, " * 2000
+    chunks = [text[i:i + 64] for i in range(0, len(text), 64)]
+    incremental = IncrementalCleaner(cleaner, max_pending=1000)
+    outputs = []
+    for chunk in chunks:
+        outputs.append(incremental.feed(chunk))
+        # the text held back is cut at a whitespace once it is longer than max_pending
+        assert incremental.pending_size <= 1000 + 64
+    outputs.append(incremental.flush())
+    assert ''.join(outputs) == cleaner.clean(text)
+    assert sum(1 for output in outputs if output) > 40
+    sentences = list(cleaner.iter_sentences(chunks, max_pending=1000))
+    assert ''.join(sentences) == cleaner.clean(text)
+    assert len(sentences) > 40 and max(len(sentence) for sentence in sentences) <= 2 * 1000
+    assert ''.join(cleaner.iter_clean(chunks)) == cleaner.clean(text)
+
+def test_iter_lines():
+    content = "fyrsta lína\nönnur\x0clína\n\n síðasta lína"
+    assert list(iter_lines(io.StringIO(content))) == content.splitlines()
+
 def test_labelled_translations():
     cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup, delete_labelled_translations=True)
     assert cleaner.clean("algengt er að skrifa Halló Heimur (e. Hello World)") == "algengt er að skrifa Halló Heimur"
@@ -73,6 +164,120 @@ def test_helper_functions():
     assert cleaner.validate_characters("cwartz").strip() == "kvarts"
     assert cleaner.validate_characters("123").strip() == "123"
 
+def test_text_to_tokens():
+    assert TextCleaner.text_to_tokens("raki (e. humidity) er  mikill") == ["raki", "(e. humidity)", "er", "", "mikill"]
+    assert TextCleaner.text_to_tokens("(a (b c) d) e") == ["(a", "(b c) d)", "e"]
+    assert TextCleaner.text_to_tokens("a (b c") == ["a", "(b", "c"]
+    assert TextCleaner.text_to_tokens("1) a 2) b") == ["1) a 2)", "b"]
+
+def test_text_to_tokens_rule():
+    # whitespaces are not split points when the next parenthesis after them is a closing one
+    legacy = re.compile(r'\s(?![^(]*\))')
+    texts = ["a b c)", "y\n)", "(a (b c) d) e", "http://a.is foo) bar", "( ) ( ( ) ) )) ( a", "a\n\n(b)\t)"]
+    texts += [''.join(chars) for size in range(7) for chars in itertools.product('a( )\n', repeat=size)]
+    for text in texts:
+        assert TextCleaner.text_to_tokens(text) == legacy.split(text), text
+
+def test_tidy_up():
+    assert TextCleaner.tidy_up("  hæ  \n\t hó ") == "hæ hó"
+    assert TextCleaner.tidy_up("já . , ? nei (. ) ") == "já . nei ("
+    assert TextCleaner.tidy_up(" \n ") == ""
+
+def test_char_table():
+    cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup)
+    assert cleaner.validate_characters("ßØ×κ") == "ssÖkappa "
+    # replacements inserting characters that are replaced in turn are applied one after the other
+    cleaner = TextCleaner(char_replacement={'a': 'k', 'k': 'x'})
+    assert cleaner.validate_characters("ak") == "xx "
+    assert cleaner.validate_characters("ka") == "xk "
+    # the table follows changes of the replacement dictionary
+    cleaner.update_replacement_dictionary({'b': 'd'})
+    assert cleaner.validate_characters("ab") == "kd "
+    # keys of more than one character never match
+    assert TextCleaner(char_replacement={'ae': 'æ'}).clean("ae h . b") == "ae h . b"
+    assert TextCleaner(post_dict={'ch': 'k'}).clean("ae h . b") == "ae h . b"
+    assert TextCleaner(punct_set=['...', ','], punct_replacement=' x').clean("ae h . b") == "ae h b"
+
+def test_token_cache():
+    cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup, token_cache_size=2)
+    assert cleaner.clean("ß ß Ø") == "ss ss Ö"
+    assert cleaner.token_cache_info() == (1, 2, 0, 2, 2)
+    assert cleaner.clean("π") == "pí"
+    assert cleaner.token_cache_info().evictions == 1
+    # cached tokens are dropped when the replacement rules change
+    cleaner.update_replacement_dictionary({'ß': 's'})
+    assert cleaner.clean("ß") == "s"
+    assert TextCleaner().token_cache_info() is None
+
+def test_result_cache():
+    result_cache = LRUCache(100)
+    cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup,
+                          result_cache=result_cache)
+    assert cleaner.clean("ß Ø") == "ss Ö"
+    assert cleaner.clean("ß Ø") == "ss Ö"
+    assert cleaner.clean_batch(["ß Ø", "π"]) == ["ss Ö", "pí"]
+    assert cleaner.result_cache_info().hits == 2
+    assert cleaner.result_cache_info().hit_rate == 0.5
+    # the cache can be shared, results are kept apart by the fingerprint of the configuration
+    same_cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup,
+                               result_cache=result_cache)
+    other_cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup,
+                                preserve_strings=['ß'], result_cache=result_cache)
+    assert same_cleaner.fingerprint() == cleaner.fingerprint()
+    assert other_cleaner.fingerprint() != cleaner.fingerprint()
+    assert same_cleaner.clean("ß Ø") == "ss Ö"
+    assert other_cleaner.clean("ß Ø") == "ß Ö"
+    assert result_cache.info().hits == 3
+    cleaner.update_replacement_dictionary({'ß': 's'})
+    assert cleaner.clean("ß Ø") == "s Ö"
+
+def test_persistent_cache(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    with SqliteCache(path) as result_cache:
+        cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup,
+                              result_cache=result_cache)
+        assert cleaner.clean_batch(["ß Ø", "π"]) == ["ss Ö", "pí"]
+        assert list(clean_parallel(["π", "ß"], workers=2, result_cache=result_cache,
+                                   replacement_dict=umaps.replacement_dictionary,
+                                   post_dict=umaps.post_dict_lookup)) == ["pí", "ss"]
+        assert result_cache.info().currsize == 3
+    # the results are kept between runs
+    with SqliteCache(path) as result_cache:
+        cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup,
+                              result_cache=result_cache)
+        assert cleaner.clean("π") == "pí"
+        assert cleaner.clean_batch(["ß Ø", "ß"]) == ["ss Ö", "ss"]
+        assert result_cache.info().hits == 3
+        assert result_cache.info().misses == 0
+    # and dropped when the cleaning rules change
+    with SqliteCache(path, version='changed') as result_cache:
+        assert len(result_cache) == 0
+
+def test_cleaner_config():
+    base = CleanerConfig.create(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup)
+    tenant = base.with_overrides(char_replacement={'a': 'k'})
+    # the base maps are shared, not copied
+    assert tenant.replacement_dict is base.replacement_dict
+    assert tenant == base.with_overrides(char_replacement={'a': 'k'})
+    assert hash(tenant) == hash(base.with_overrides(char_replacement={'a': 'k'}))
+    registry = ConfigRegistry(maxsize=2)
+    cleaner = registry.cleaner(tenant)
+    same_cleaner = registry.cleaner(base.with_overrides(char_replacement={'a': 'k'}))
+    assert cleaner.char_table is same_cleaner.char_table
+    assert cleaner.clean("aábd ß") == "kábd ss"
+    reference = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup,
+                            char_replacement={'a': 'k'})
+    assert cleaner.fingerprint() == reference.fingerprint()
+    # changing one cleaner leaves the others alone
+    cleaner.update_replacement_dictionary({'b': 'p'})
+    assert cleaner.clean("aábd") == "kápd"
+    assert same_cleaner.clean("aábd") == "kábd"
+    assert registry.cleaner(tenant).clean("aábd") == "kábd"
+    registry.cleaner(base)
+    registry.cleaner(base.with_overrides(preserve_strings=['ß']))
+    assert registry.info().evictions == 1
+    assert registry.info().currsize == 2
+
 def test_replace_character():
     cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup, punct_replacement=' world')
     ## replacement configurations mutate the state of the cleaner 
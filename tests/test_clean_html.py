@@ -1,4 +1,10 @@
 # This Python file uses the following encoding: utf-8
+import io
+import os
+import re
+
+import pytest
+
 from text_cleaner import *
 
 
@@ -15,6 +21,14 @@ def test_text_cleanup():
     assert tidy_up_text_format(".,\n   \n\n?   \n\n   .! :.") == "."
     assert tidy_up_text_format("Trying,  is the first! :step: toward failure.") == "Trying, is the first!step: toward failure."
 
+def test_clean_up_urls():
+    assert clean_up_urls("sjá http://mbl.is/frett, og svo") == "sjá http://mbl.is/frett , og svo"
+    assert clean_up_urls("www.ruv.is.\nhttp://mbl.is.\nog http://a.is") == "www.ruv.is . http://mbl.is . og http://a.is"
+    assert clean_up_urls("www.ruv.is. b", at_start=False) == "www.ruv.is. b"
+    assert tidy_up_text_format("Sjá:  http://mbl.is/frett, eða\n\nwww.ruv.is. ") == "Sjá: http://mbl.is/frett , eða\nwww.ruv.is."
+    # long lines without an end of the url take linear time
+    assert tidy_up_text_format("http://mbl.is " * 20000) == ("http://mbl.is " * 20000).strip()
+
 def test_html_parse():
     html_cleaner = HtmlCleaner()
     result = html_cleaner.clean_html(get_html_string())
@@ -22,6 +36,184 @@ def test_html_parse():
     assert result.find('</') == -1
     assert result.find('(e.') > 1
 
+def test_iter_clean_html(tmp_path):
+    html_cleaner = HtmlCleaner()
+    html = '<html><body><p>not content</p><div class="content-text">\n' + get_html_string() + '\n' \
+           '<table><tr><th>Ár</th><th>Fjöldi</th></tr>\n<tr><td>2020</td><td>15</td></tr></table>\n' \
+           '<script>var x = 1;</script><ul><li>eitt</li><li>tvö<br/></li></ul></div><p>not content</p></body></html>'
+    html_file = tmp_path / 'chapter.html'
+    html_file.write_text(html)
+    result = html_cleaner.clean_html(str(html_file), from_file=True)
+    assert result.find('Ár: 2020') > 0
+    assert result.find('not content') == -1
+    for chunk_size in [1, 10, 100000]:
+        assert ''.join(html_cleaner.iter_clean_html(html, chunk_size=chunk_size)) == result
+    assert ''.join(html_cleaner.iter_clean_html(str(html_file), from_file=True)) == result
+    # the text is yielded in pieces
+    assert len(list(html_cleaner.iter_clean_html(html, chunk_size=10))) > 1
+
+def test_clean_html_files(tmp_path):
+    html = '<div class="content-text">' + get_html_string() + '</div>'
+    (tmp_path / 'in' / 'kafli').mkdir(parents=True)
+    for name in ['in/a.html', 'in/kafli/b.xhtml', 'in/kafli/notes.txt']:
+        (tmp_path / name).write_text(html)
+    output_dir = str(tmp_path / 'out')
+    summary = clean_html_files([str(tmp_path / 'in')], output_dir, workers=1)
+    assert (summary.converted, summary.skipped) == (2, 0)
+    assert (tmp_path / 'out' / 'kafli' / 'b.txt').read_text() == HtmlCleaner().clean_html(html)
+    # up to date: newer than the html, or with the same content
+    assert clean_html_files([str(tmp_path / 'in')], output_dir, workers=1).skipped == 2
+    os.utime(str(tmp_path / 'in' / 'a.html'), (1e10, 1e10))
+    assert clean_html_files([str(tmp_path / 'in')], output_dir, workers=1).skipped == 2
+    (tmp_path / 'in' / 'a.html').write_text(html + '<p>meira</p>')
+    os.utime(str(tmp_path / 'in' / 'a.html'), (2e10, 2e10))
+    summary = clean_html_files([str(tmp_path / 'in' / '**' / '*.html')], output_dir, workers=2)
+    assert (summary.converted, summary.skipped) == (1, 0)
+    # converted again with another configuration
+    other_cleaner = HtmlCleaner(tag_replacements={'p': '!'})
+    summary = clean_html_files([str(tmp_path / 'in')], output_dir, html_cleaner=other_cleaner, workers=1)
+    assert (summary.converted, summary.skipped) == (2, 0)
+    assert (tmp_path / 'out' / 'kafli' / 'b.txt').read_text() == other_cleaner.clean_html(html)
+
+def test_clean_html_files_collisions(tmp_path):
+    for name in ['a/ch1.html', 'b/ch1.html', 'b/ch2.htm', 'b/ch2.html']:
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text('<div class="content-text"><p>' + name + '</p></div>')
+    output_dir = str(tmp_path / 'out')
+    for inputs in [[str(tmp_path / 'a' / 'ch1.html'), str(tmp_path / 'b' / 'ch1.html')],
+                   [str(tmp_path / 'a'), str(tmp_path / 'b' / '*1.html')]]:
+        with pytest.raises(ValueError, match='ch1.txt') as error:
+            clean_html_files(inputs, output_dir, workers=1)
+        assert os.path.join('a', 'ch1.html') in str(error.value) and os.path.join('b', 'ch1.html') in str(error.value)
+    with pytest.raises(ValueError, match='ch2.txt'):
+        clean_html_files([str(tmp_path / 'b')], output_dir, workers=1)
+    assert not os.path.exists(output_dir)
+    # the same document found twice is converted once
+    summary = clean_html_files([str(tmp_path / 'a'), str(tmp_path / 'a' / 'ch1.html')], output_dir, workers=1)
+    assert (summary.converted, summary.skipped) == (1, 0)
+
+def test_clean_html_tables():
+    html = '<div class="content-text"><table><thead><tr><th rowspan="2">Ár</th><th colspan="2">Fjöldi</th></tr>' \
+           '<tr><th>Karlar</th><th>Konur</th></tr></thead><tbody><tr><td rowspan="2">2020</td><td>15</td>' \
+           '<td>16</td></tr><tr><td colspan="2">30</td></tr><tr><th>Alls</th><td>45</td><td>16</td></tr>' \
+           '</tbody></table></div>'
+    html_cleaner = HtmlCleaner()
+    result = html_cleaner.clean_html(html)
+    # the cell spanning two rows takes the first column of the next row
+    assert result == '. Ár: 2020 . Fjöldi Karlar: 15 . Fjöldi Konur: 16 . Fjöldi Karlar Konur: 30 . ' \
+                     'Ár: Alls . Fjöldi Karlar: 45 . Fjöldi Konur: 16 .'
+    assert ''.join(html_cleaner.iter_clean_html(html)) == result
+
+def test_content_only_parsing(tmp_path):
+    html = '<html><head><style>p { color: red; }</style></head><body><nav><ol><li>Efnisyfirlit</li></ol></nav>' \
+           '<div id="main" class="chapter content-text"><nav><a>fyrri</a></nav><p>Texti kaflans</p>' \
+           '<script>var x = 1;</script></div><p>not content</p></body></html>'
+    html_file = tmp_path / 'chapter.html'
+    html_file.write_text(html)
+    html_cleaner = HtmlCleaner()
+    assert html_cleaner.clean_html(str(html_file), from_file=True) == 'Texti kaflans .'
+    assert ''.join(html_cleaner.iter_clean_html(html)) == 'Texti kaflans .'
+    # only the content element is parsed
+    assert html_cleaner.extract_html_from_file(str(html_file)).find_parent('body') is None
+    keep_nav = HtmlCleaner(pruned_elements=['script', 'style'])
+    assert keep_nav.clean_html(str(html_file), from_file=True) == 'fyrri Texti kaflans .'
+    # a string is a class, as in find()
+    by_class = HtmlCleaner(content_parent_div='content-text')
+    assert by_class.clean_html(str(html_file), from_file=True) == 'Texti kaflans .'
+    assert ''.join(by_class.iter_clean_html(html)) == 'Texti kaflans .'
+    assert ''.join(keep_nav.iter_clean_html(html)) == 'fyrri Texti kaflans .'
+
+def test_html_result_cache(tmp_path):
+    html = '<div class="content-text">' + get_html_string() + '</div>'
+    html_file = tmp_path / 'chapter.html'
+    html_file.write_text(html)
+    path = str(tmp_path / 'cache.sqlite')
+    with SqliteCache(path, maxsize=2) as result_cache:
+        html_cleaner = HtmlCleaner(result_cache=result_cache)
+        result = html_cleaner.clean_html(str(html_file), from_file=True)
+        assert ''.join(html_cleaner.iter_clean_html(html)) == result
+        assert html_cleaner.clean_html(html) == HtmlCleaner().clean_html(html)
+        assert html_cleaner.result_cache_info().hits == 1
+        # file objects are not looked up
+        assert html_cleaner.clean_html(io.StringIO(html)) == HtmlCleaner().clean_html(html)
+        assert html_cleaner.result_cache_info().hits == 1
+        regex_cleaner = HtmlCleaner(content_parent_div={'class': re.compile('content')}, result_cache=LRUCache(4))
+        assert regex_cleaner.clean_html(str(html_file), from_file=True) == result
+        assert regex_cleaner.result_cache_info().misses == 1
+        # functions have no fingerprint, the cache is not used
+        functions_cache = LRUCache(4)
+        functions = [lambda value: value == 'content-text', lambda value: value is not None and 'content' in value]
+        for function in functions:
+            function_cleaner = HtmlCleaner(content_parent_div={'class': function}, result_cache=functions_cache)
+            assert function_cleaner.fingerprint() is None
+            assert function_cleaner.clean_html(str(html_file), from_file=True) == \
+                HtmlCleaner(content_parent_div={'class': function}).clean_html(str(html_file), from_file=True)
+        assert functions_cache.info().currsize == 0
+    # the texts are kept between runs, by the hash of the html and the configuration
+    with SqliteCache(path, maxsize=2) as result_cache:
+        assert ''.join(HtmlCleaner(result_cache=result_cache).iter_clean_html(str(html_file), from_file=True)) == result
+        other_cleaner = HtmlCleaner(tag_replacements={'p': '!'}, result_cache=result_cache)
+        assert other_cleaner.fingerprint() != HtmlCleaner().fingerprint()
+        assert other_cleaner.clean_html(html) != result
+        assert result_cache.info().hits == 1
+    # the least recently used text was evicted
+    with SqliteCache(path, maxsize=2) as result_cache:
+        assert result_cache.info().currsize == 2
+        assert HtmlCleaner(result_cache=result_cache).clean_html(html) == HtmlCleaner().clean_html(html)
+        assert result_cache.info().misses == 1
+
+def test_iter_segments():
+    html = '<html><body><div class="content-text"><h1><span class="sentence" id="t1">Fyrsti kafli</span></h1>' + \
+           get_html_string() + '<p>Laus texti <span class="sentence" id="s1">í lokin</span></p><table><tr><th>Ár</th>' \
+           '<th>Fjöldi</th></tr><tr><td><span class="sentence" id="c1">2020</span></td>' \
+           '<td><span class="sentence" id="c2">15</span></td></tr></table></div></body></html>'
+    html_cleaner = HtmlCleaner()
+    segments = list(html_cleaner.iter_segments(html))
+    assert [segment_id for segment_id, text in segments] == \
+           ['t1', 'qitl_0591', 'qitl_0592', 'qitl_0593', 'qitl_0594', 'qitl_0595', 'qitl_0596', 'qitl_0597', None,
+            's1', 'c1']
+    assert segments[0] == ('t1', 'Fyrsti kafli .')
+    assert segments[3] == ('qitl_0593', 'salutogenesis) .')
+    assert segments[8:] == [(None, 'Laus texti'), ('s1', 'í lokin .'), ('c1', 'Ár: 2020 . Fjöldi: 15 .')]
+    assert list(html_cleaner.iter_segments(html, chunk_size=7)) == segments
+    assert list(html_cleaner.iter_segments(html, segment_attrs={'class': 'chapter'})) == \
+           [(None, html_cleaner.clean_html(html.replace('<html><body>', '').replace('</body></html>', '')))]
+
+def test_html_bytes(tmp_path):
+    html = '<html><head><meta charset="windows-1252"></head><body><div class="content-text">' \
+           '<p>Þórður á\r\nÍslandi</p></div></body></html>'
+    result = 'Þórður á\nÍslandi .'
+    assert detect_encoding(html.encode('cp1252')) == 'cp1252'
+    assert detect_encoding('<?xml version="1.0" encoding="ISO-8859-1"?>'.encode('latin-1')) == 'iso8859-1'
+    assert detect_encoding(html.encode('utf-16')) == 'utf-16'
+    assert detect_encoding(b'<meta charset="utf-16"><p>texti</p>') == 'utf-8'
+    assert detect_encoding(b'<meta charset="unknown"><p>texti</p>') == 'utf-8'
+    html_cleaner = HtmlCleaner()
+    utf8_html = html.replace('windows-1252', 'utf-8')
+    for html, encoding in [(html, 'cp1252'), (utf8_html, 'utf-8-sig'), (utf8_html, 'utf-16')]:
+        data = html.encode(encoding)
+        assert decode_html(data) == html.replace('\r\n', '\n')
+        assert html_cleaner.clean_html(data) == result
+        assert ''.join(html_cleaner.iter_clean_html(data, chunk_size=3)) == result
+        html_file = tmp_path / 'kafli.html'
+        html_file.write_bytes(data)
+        with open(str(html_file), 'rb') as binary_file:
+            assert ''.join(html_cleaner.iter_clean_html(binary_file)) == result
+        for use_mmap in [True, False]:
+            assert read_html(str(html_file), use_mmap) == html.replace('\r\n', '\n')
+            assert HtmlCleaner(use_mmap=use_mmap).clean_html(str(html_file), from_file=True) == result
+            assert ''.join(HtmlCleaner(use_mmap=use_mmap).iter_clean_html(str(html_file), from_file=True)) == result
+
+def test_text_tidier():
+    text = ".,\n   \n\n?   \n\n   .! :.\nHello.  \n\n World. www.x.is http://mbl.is, og\nwww.ruv.is.  \n"
+    tidier = TextTidier()
+    assert ''.join([tidier.feed(char) for char in text] + [tidier.flush()]) == tidy_up_text_format(text)
+    # a long line is cut before its first URL
+    line = 'Sjá nánar á vef,  . ' * 3 + 'http://mbl.is, og www.ruv.is.  \n'
+    pieces = [tidier.feed(char) for char in line] + [tidier.flush()]
+    assert ''.join(pieces) == tidy_up_text_format(line)
+    assert len([piece for piece in pieces if piece]) > 2
+
 
 def get_html_string():
     return '<p id="hix00274"><span id="qitl_0591" class="sentence">Í kjölfarið sýndi hann fram á að það stuðli að ' \
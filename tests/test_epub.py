@@ -0,0 +1,58 @@
+# This Python file uses the following encoding: utf-8
+import zipfile
+
+import pytest
+
+from text_cleaner import *
+
+CONTAINER = '<?xml version="1.0"?><container version="1.0" ' \
+            'xmlns="urn:oasis:names:tc:opendocument:xmlns:container"><rootfiles>' \
+            '<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>' \
+            '</rootfiles></container>'
+PACKAGE = '<?xml version="1.0"?><package xmlns="http://www.idpf.org/2007/opf" version="3.0"><manifest>' \
+          '<item id="c1" href="text/kafli%201.xhtml" media-type="application/xhtml+xml"/>' \
+          '<item id="c2" href="text/kafli2.xhtml" media-type="application/xhtml+xml"/>' \
+          '<item id="css" href="style.css" media-type="text/css"/>' \
+          '<item id="cover" href="cover.xhtml" media-type="application/xhtml+xml"/>' \
+          '</manifest><spine><itemref idref="cover"/><itemref idref="c2"/><itemref idref="c1"/></spine></package>'
+
+
+def write_epub(path):
+    with zipfile.ZipFile(str(path), 'w') as epub:
+        epub.writestr('mimetype', 'application/epub+zip')
+        epub.writestr('META-INF/container.xml', CONTAINER)
+        epub.writestr('OEBPS/content.opf', PACKAGE)
+        epub.writestr('OEBPS/style.css', 'p {}')
+        epub.writestr('OEBPS/cover.xhtml', '<html><body><img src="cover.jpg"/></body></html>')
+        epub.writestr('OEBPS/text/kafli 1.xhtml', '<html><body><div class="content-text">'
+                                                  '<p>Fyrsti kafli 🎉 π</p></div></body></html>')
+        epub.writestr('OEBPS/text/kafli2.xhtml', '<html><body><div class="content-text">'
+                                                 '<p>Annar kafli</p><ul><li>eitt</li></ul></div></body></html>')
+
+
+def test_epub_cleaner(tmp_path):
+    epub_path = str(tmp_path / 'book.epub')
+    write_epub(epub_path)
+    assert EpubCleaner.spine(epub_path) == ['OEBPS/cover.xhtml', 'OEBPS/text/kafli2.xhtml', 'OEBPS/text/kafli 1.xhtml']
+    epub_cleaner = EpubCleaner(workers=1)
+    assert list(epub_cleaner.iter_documents(epub_path)) == [('OEBPS/cover.xhtml', ''),
+                                                            ('OEBPS/text/kafli2.xhtml', 'Annar kafli . eitt .'),
+                                                            ('OEBPS/text/kafli 1.xhtml', 'Fyrsti kafli 🎉 π .')]
+    parallel_cleaner = EpubCleaner(text_cleaner=TextCleaner(), workers=2)
+    assert parallel_cleaner.clean_epub(epub_path) == 'Annar kafli . eitt .\nFyrsti kafli .'
+    # with a result cache, only the documents not in the cache are extracted
+    result_cache = LRUCache(10)
+    cached_cleaner = EpubCleaner(html_cleaner=HtmlCleaner(result_cache=result_cache), workers=2)
+    assert list(cached_cleaner.iter_documents(epub_path)) == list(epub_cleaner.iter_documents(epub_path))
+    assert list(cached_cleaner.iter_documents(epub_path)) == list(epub_cleaner.iter_documents(epub_path))
+    assert result_cache.info().hits == 3
+
+
+def test_malformed_epub(tmp_path):
+    epub_path = str(tmp_path / 'book.epub')
+    with zipfile.ZipFile(epub_path, 'w') as epub:
+        epub.writestr('mimetype', 'application/epub+zip')
+        epub.writestr('META-INF/container.xml', CONTAINER.replace('rootfile ', 'other '))
+        epub.writestr('OEBPS/content.opf', PACKAGE)
+    with pytest.raises(ValueError, match='no rootfile in META-INF/container.xml'):
+        EpubCleaner.spine(epub_path)
@@ -0,0 +1,31 @@
+# This Python file uses the following encoding: utf-8
+from text_cleaner import *
+import text_cleaner.unicode_maps as umaps
+
+from tests.test_clean_html import get_html_string
+
+
+def test_cleaning_pipeline(tmp_path):
+    html = '<html><body><div class="content-text">' + get_html_string() + \
+           '<table><tr><th>Ár</th><th>Fjöldi 😎</th></tr><tr><td>2020</td><td>15</td></tr></table></div></body></html>'
+    html_file = tmp_path / 'kafli.html'
+    html_file.write_text(html, encoding='utf-8')
+    html_cleaner = HtmlCleaner()
+    text_cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup)
+    pipeline = CleaningPipeline(html_cleaner, text_cleaner)
+    result = text_cleaner.clean(html_cleaner.clean_html(str(html_file), from_file=True))
+    assert pipeline.clean(str(html_file), from_file=True) == result
+    assert pipeline.clean(html) == result
+    assert ''.join(pipeline.iter_clean(html, chunk_size=10)) == result
+    assert ''.join(pipeline.iter_sentences(html, chunk_size=10)) == result
+    assert CleaningPipeline().clean(html) == TextCleaner().clean(HtmlCleaner().clean_html(html))
+
+
+def test_pipeline_segments():
+    html = '<div class="content-text">' + get_html_string() + '</div>'
+    text_cleaner = TextCleaner(replacement_dict=umaps.replacement_dictionary, post_dict=umaps.post_dict_lookup)
+    pipeline = CleaningPipeline(text_cleaner=text_cleaner)
+    segments = list(pipeline.iter_segments(html))
+    assert segments == [(segment_id, text_cleaner.clean(text))
+                        for segment_id, text in HtmlCleaner().iter_segments(html)]
+    assert segments[2] == ('qitl_0593', 'salutogenesis)')
@@ -1,2 +1,50 @@
-from .clean import *
-from .clean_html import *
\ No newline at end of file
+"""
+    The public names of the text_cleaner package are loaded lazily: 'import text_cleaner' is cheap, clean.py is
+    imported on first access of e.g. text_cleaner.TextCleaner, clean_html.py (and with it BeautifulSoup) on first
+    access of e.g. text_cleaner.HtmlCleaner. The emoji dictionary is only loaded for text with a codepoint of
+    the emoji blocks of Unicode, sqlite3 only for a persistent cache.
+"""
+import importlib
+
+# public names of the package and the submodules defining them
+_SUBMODULES = {
+    'clean': [
+        'TextCleaner', 'CharTable', 'COMMON_PUNCT', 'URL_PATTERN', 'EN_LABEL', 'SSML_LANG_START', 'SSML_LANG_END',
+        'BATCH_SEPARATOR', 'clean_parallel', 'iter_chunks', 'iter_lines',
+        'IncrementalCleaner', 'SentenceEmitter',
+    ],
+    'cache': [
+        'LRUCache', 'SqliteCache', 'CacheInfo', 'source_version',
+    ],
+    'config': [
+        'CleanerConfig', 'ConfigRegistry', 'FrozenMap', 'get_cleaner',
+    ],
+    'clean_html': [
+        'HtmlCleaner', 'PUNCTUATION', 'TOP_TABLE_ELEM', 'TABLE_ROW', 'TABLE_HEADER', 'TABLE_CELL',
+        'tidy_up_text_format', 'remove_whitespace_before_punctuation', 'remove_consecutive_punct_marks',
+        'clean_up_urls', 'ContentStreamParser', 'TextTidier', 'clean_html_files', 'ConversionSummary',
+        'PRUNED_ELEMENTS', 'SEGMENT_ATTRS', 'detect_encoding', 'decode_html', 'read_html',
+    ],
+    'epub': [
+        'EpubCleaner',
+    ],
+    'pipeline': [
+        'CleaningPipeline',
+    ],
+}
+_ATTRIBUTES = {name: submodule for submodule, names in _SUBMODULES.items() for name in names}
+
+__all__ = list(_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name in _ATTRIBUTES:
+        value = getattr(importlib.import_module('.' + _ATTRIBUTES[name], __name__), name)
+        # cache the value, __getattr__ is only called for missing attributes
+        globals()[name] = value
+        return value
+    raise AttributeError("module '" + __name__ + "' has no attribute '" + name + "'")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,270 @@
+"""
+    Caches for the results of the text cleaning. The caches count their hits, misses and evictions,
+    see CacheInfo.
+
+    LRUCache keeps the results in memory, SqliteCache stores them on disk for repeated runs over the same
+    input, optionally limited in the number of results or their total size. Persistent results are only valid
+    as long as the cleaning rules do not change, SqliteCache therefore stores the source_version() of the
+    package and drops all results when opened with a different version.
+"""
+import collections
+import hashlib
+import os
+
+# number of results stored by SqliteCache.put() before they are committed
+COMMIT_INTERVAL = 1000
+# maximum number of keys in one query of SqliteCache.get_many()
+QUERY_SIZE = 500
+
+
+class CacheInfo(collections.namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])):
+    """
+    Statistics of a cache.
+    """
+    __slots__ = ()
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        The share of lookups answered from the cache, 0.0 if there were no lookups yet.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache:
+    """
+    A bounded in-memory cache, evicting the least recently used entry when full.
+    """
+
+    def __init__(self, maxsize: int):
+        """
+        :param maxsize: the maximum number of entries in the cache
+        """
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """
+        Return the value stored for 'key' and mark it as recently used, or 'default' if 'key' is not cached.
+        """
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value) -> None:
+        """
+        Store 'value' for 'key', evicting the least recently used entry if the cache is full.
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, keys: list) -> list:
+        """
+        Return the values stored for 'keys', None for keys not in the cache.
+        """
+        return [self.get(key) for key in keys]
+
+    def put_many(self, items: list) -> None:
+        """
+        Store the (key, value) pairs of 'items'.
+        """
+        for key, value in items:
+            self.put(key, value)
+
+    def clear(self) -> None:
+        """
+        Remove all entries, the statistics are kept.
+        """
+        self.entries.clear()
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self.entries))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class SqliteCache:
+    """
+    A persistent cache in an sqlite3 database. Keys are (fingerprint, content) pairs, stored as the fingerprint
+    followed by the SHA-256 of the content, see persistent_key(). Values are strings.
+
+    The cache can be limited in the number of entries and in the total length of the stored values. When a limit
+    is exceeded, the least recently used entries are evicted on the next commit().
+    """
+
+    def __init__(self, path: str, version=None, maxsize=None, max_chars=None):
+        """
+        Opens or creates the cache database at 'path'. If the database was written with another version,
+        all results in it are dropped.
+
+        :param path: filename of the database
+        :param version: version of the results, default is source_version()
+        :param maxsize: if not None, the maximum number of entries in the cache
+        :param max_chars: if not None, the maximum total length of the values in the cache
+        """
+        self.path = path
+        self.version = version or source_version()
+        self.maxsize = maxsize
+        self.max_chars = max_chars
+        # imported here, only needed for a persistent cache
+        import sqlite3
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+        row = self.connection.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if row is None or row[0] != self.version:
+            # the table is created anew, its layout may have changed with the version
+            self.connection.execute('DROP TABLE IF EXISTS entries')
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (self.version,))
+        self.connection.execute('CREATE TABLE IF NOT EXISTS entries '
+                                '(key TEXT PRIMARY KEY, value TEXT, length INTEGER, used INTEGER)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+        self.connection.commit()
+        # the time of the last use of an entry, as a counter of the uses in all runs
+        self.clock = self.connection.execute('SELECT COALESCE(MAX(used), 0) FROM entries').fetchone()[0]
+        self.uncommitted = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def limited(self) -> bool:
+        return self.maxsize is not None or self.max_chars is not None
+
+    def get(self, key, default=None):
+        """
+        Return the value stored for 'key', or 'default' if 'key' is not cached.
+        """
+        value = self.get_many([key])[0]
+        return default if value is None else value
+
+    def get_many(self, keys: list) -> list:
+        """
+        Return the values stored for 'keys', None for keys not in the cache.
+        """
+        stored_keys = [persistent_key(key) for key in keys]
+        values = {}
+        for start in range(0, len(stored_keys), QUERY_SIZE):
+            query_keys = stored_keys[start:start + QUERY_SIZE]
+            query = 'SELECT key, value FROM entries WHERE key IN (' + ','.join('?' * len(query_keys)) + ')'
+            values.update(self.connection.execute(query, query_keys))
+        results = [values.get(key) for key in stored_keys]
+        if self.limited and values:
+            self.clock += 1
+            self.connection.executemany('UPDATE entries SET used = ? WHERE key = ?',
+                                        [(self.clock, key) for key in values])
+        misses = results.count(None)
+        self.hits += len(results) - misses
+        self.misses += misses
+        return results
+
+    def put(self, key, value) -> None:
+        """
+        Store 'value' for 'key'. The results are committed in batches of COMMIT_INTERVAL and on close(), see
+        commit().
+        """
+        self.put_many([(key, value)])
+
+    def put_many(self, items: list) -> None:
+        """
+        Store the (key, value) pairs of 'items'.
+        """
+        self.clock += 1
+        self.connection.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                                    [(persistent_key(key), value, len(value), self.clock) for key, value in items])
+        self.uncommitted += len(items)
+        if self.uncommitted >= COMMIT_INTERVAL:
+            self.commit()
+
+    def commit(self) -> None:
+        """
+        Evict the least recently used entries if the cache exceeds its limits, and commit.
+        """
+        if self.limited:
+            self.evict()
+        self.connection.commit()
+        self.uncommitted = 0
+
+    def evict(self) -> None:
+        count, chars = self.connection.execute('SELECT COUNT(*), COALESCE(SUM(length), 0) FROM entries').fetchone()
+        excess_entries = count - self.maxsize if self.maxsize is not None else 0
+        excess_chars = chars - self.max_chars if self.max_chars is not None else 0
+        evicted = []
+        for key, length in self.connection.execute('SELECT key, length FROM entries ORDER BY used'):
+            if excess_entries <= 0 and excess_chars <= 0:
+                break
+            evicted.append((key,))
+            excess_entries -= 1
+            excess_chars -= length
+        self.connection.executemany('DELETE FROM entries WHERE key = ?', evicted)
+        self.evictions += len(evicted)
+
+    def clear(self) -> None:
+        """
+        Remove all entries, the statistics are kept.
+        """
+        self.connection.execute('DELETE FROM entries')
+        self.commit()
+
+    def close(self) -> None:
+        """
+        Commit the stored results and close the database.
+        """
+        self.commit()
+        self.connection.close()
+
+    def info(self) -> CacheInfo:
+        size = self.connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, size)
+
+    def __len__(self) -> int:
+        return self.info().currsize
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def persistent_key(key) -> str:
+    """
+    Turn a (fingerprint, content) key into a string of fixed length, content can be a string or bytes.
+    """
+    fingerprint, content = key
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return fingerprint + ':' + hashlib.sha256(content).hexdigest()
+
+
+_source_version = None
+
+
+def source_version() -> str:
+    """
+    Return a hash of the source files of the text_cleaner package. It changes with every change of the
+    cleaning code or of the maps in unicode_maps.py, constants.py and emoji_dictionary.py.
+    """
+    global _source_version
+    if _source_version is None:
+        digest = hashlib.sha256()
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        for filename in sorted(os.listdir(package_dir)):
+            if filename.endswith('.py'):
+                digest.update(filename.encode('utf-8'))
+                with open(os.path.join(package_dir, filename), 'rb') as source_file:
+                    digest.update(source_file.read())
+        _source_version = digest.hexdigest()
+    return _source_version
@@ -15,25 +15,71 @@
 
 """
 import argparse, sys
+import collections
+import hashlib
+import itertools
+import json
 import logging
+import os
 import re
+from text_cleaner import cache
 from text_cleaner import constants as consts
-from text_cleaner import emoji_dictionary
+from text_cleaner import emoji_matcher
+from text_cleaner import parallel
 
 # Common punctuation symbols, often to be ignored at start/end of tokens
 COMMON_PUNCT = ',.?!:;()'
 URL_PATTERN = '^(www)|(http).*'
 EN_LABEL = '(e.'
+URL_REGEX = re.compile(URL_PATTERN)
+WHITESPACE = re.compile(r'\s')
+PARENTHESIS = re.compile(r'[()]')
+# matches a text up to and including its last whitespace
+LAST_WHITESPACE = re.compile(r'.*\s', re.DOTALL)
+# the following regex demarks a string that starts with a punctuation mark,
+# followed by 1 or more occurrences of 0 or more whitespaces, followed by 1
+# or more punctuation marks
+CONSECUTIVE_PUNCTUATION = re.compile(r'([' + COMMON_PUNCT + r'])(\s*[' + COMMON_PUNCT + r']+)+')
+# the same for text where whitespaces have been collapsed to single spaces
+SPACED_CONSECUTIVE_PUNCTUATION = re.compile(r'([' + COMMON_PUNCT + r'])(?: ?[' + COMMON_PUNCT + r'])+')
+# joins the texts in TextCleaner.clean_batch(), neither a whitespace nor a punctuation mark
+BATCH_SEPARATOR = '\x00'
+# number of lines sent to a worker process at once in clean_parallel()
+DEFAULT_CHUNKSIZE = 1000
 # SSML 1.1 standard
 SSML_LANG_START = '<lang xml:lang="en-GB"> '
 SSML_LANG_END = ' </lang>'
+# number of characters of text IncrementalCleaner and SentenceEmitter hold back before cutting it at a whitespace
+MAX_PENDING_CHARS = 4096
+# in cleaned text: a parenthesis, or a punctuation mark ending a sentence or a clause and the spaces after it
+SEGMENT_BOUNDARY = re.compile(r'[()]|([.?!,;:]) +')
+SENTENCE_END = '.?!'
+# the first character of a segment after the opening quotes and parentheses before it
+SEGMENT_START = re.compile(r'[„“"«\'(]*(\S)')
+WORD = re.compile(r'\w')
+
+
+class CharTable(dict):
+    """
+    Translation table for str.translate(), mapping codepoints to their replacement strings. Codepoints not
+    yet in the table are looked up with 'rule' on first use and the decision is cached in the table.
+    """
+
+    def __init__(self, rule):
+        super().__init__()
+        self.rule = rule
+
+    def __missing__(self, codepoint: int) -> str:
+        replacement = self.rule(chr(codepoint))
+        self[codepoint] = replacement
+        return replacement
 
 
 class TextCleaner:
 
     def __init__(self, replacement_dict={}, post_dict={}, char_replacement={}, punct_replacement='', alphabet=[],
                  punct_set=[], preserve_strings=[], emoji_replacement='.', preserve_emojis=False, describe_emojis=False,
-                 delete_labelled_translations=False):
+                 delete_labelled_translations=False, token_cache_size=0, result_cache=None):
 
         """
         Initializes the textCleaner, arguments offer custom handling of characters, symbols and strings.
@@ -60,11 +106,23 @@ class TextCleaner:
         :param emoji_replacement: str to replace emojis with, default is '.'. Note that 'preserve_emoji' and
                                 'describe_emojis' override this parameter!
         :param delete_labelled_translations: if True, we delete text/tokens labelled as foreign, default is False
+        :param token_cache_size: if > 0, cache the results of validate_characters() for this many tokens,
+                                see token_cache_info()
+        :param result_cache: a cache for the results of clean(), e.g. a cache.LRUCache or, to keep the results
+                                between runs, a cache.SqliteCache. Results are stored with the fingerprint() of the
+                                configuration, so a cache can be shared between TextCleaners
 
         """
 
         # since we might alter replacement_dictionary, make a copy of the parameter dictionary
         self.replacement_dictionary = replacement_dict.copy()
+        # compiled on first use, see compile_char_table()
+        self.char_table = None
+        # least recently used validated tokens, cleared when the replacement rules change
+        self.token_cache = cache.LRUCache(token_cache_size) if token_cache_size > 0 else None
+        self.result_cache = result_cache
+        # computed on first use, see fingerprint()
+        self.config_fingerprint = None
         self.post_dict_lookup = post_dict
         if char_replacement:
             self.update_replacement_dictionary(char_replacement)
@@ -93,6 +151,10 @@ class TextCleaner:
             self.preserve_emojis = False
             self.describe_emojis = False
             self.emoji_replacement = emoji_replacement
+        # counters for the emoji prefilter: how often a text could be returned unchanged without
+        # searching for emojis, and how often the text had to be searched
+        self.emoji_fast_path_count = 0
+        self.emoji_scan_count = 0
 
     @staticmethod
     def create_dict(keys_list: list, value: str) -> dict:
@@ -110,10 +172,7 @@ class TextCleaner:
 
     @staticmethod
     def remove_consecutive_punctuation(text: str) -> str:
-        # the following regex demarks a string that starts with a punctuation mark,
-        # followed by 1 or more occurrences of 0 or more whitespaces, followed by 1
-        # or more punctuation marks
-        return re.sub(r'([' + COMMON_PUNCT + '])(\s*[' + COMMON_PUNCT + ']+)+', r'\1', text)
+        return CONSECUTIVE_PUNCTUATION.sub(r'\1', text)
 
     @staticmethod
     def text_to_tokens(text: str) -> list:
@@ -121,8 +180,34 @@ class TextCleaner:
         Splits the input text at whitespaces into tokens. Exception
         is made within parenthesis to simplify the cleaning process.
         """
-        # the following regex demarks a string within parentheses (opening and closing parenthesis)
-        return re.split(r'\s(?![^(]*\))', text)
+        return list(TextCleaner.iter_tokens(text))
+
+    @staticmethod
+    def iter_tokens(text: str):
+        """
+        Generator version of text_to_tokens(). Each whitespace is a split point, i.e. consecutive whitespaces
+        yield empty tokens, except for whitespaces where the next parenthesis in the text is a closing one.
+
+        The text is scanned once: the text between two parentheses is split if the second one is an opening
+        parenthesis, else it is part of the unfinished token.
+        """
+        # the pieces of the unfinished token, and the position after the last parenthesis
+        carry = []
+        prev = 0
+        for match in PARENTHESIS.finditer(text):
+            if match.group() == ')':
+                carry.append(text[prev:match.end()])
+            else:
+                tokens = WHITESPACE.split(text[prev:match.end()])
+                carry.append(tokens[0])
+                tokens[0] = ''.join(carry)
+                yield from tokens[:-1]
+                carry = [tokens[-1]]
+            prev = match.end()
+        tokens = WHITESPACE.split(text[prev:])
+        carry.append(tokens[0])
+        tokens[0] = ''.join(carry)
+        yield from tokens
 
     @staticmethod
     def labelled_translation_to_ssml(token) -> str:
@@ -140,33 +225,124 @@ class TextCleaner:
         :param html: if True, first parse the input text as html
         :return: a cleaned version of 'text' according to init settings
         """
+        if self.result_cache is None:
+            return self.clean_uncached(text)
+        key = (self.fingerprint(), text)
+        cleaned = self.result_cache.get(key)
+        if cleaned is None:
+            cleaned = self.clean_uncached(text)
+            self.result_cache.put(key, cleaned)
+        return cleaned
+
+    def clean_uncached(self, text: str) -> str:
+        """
+        Same as clean(), without looking up the result cache.
+        """
         clean_text = self.process_emojis(text)
-        clean_text = self.text_to_tokens(clean_text)
-
-        cleaned_text = ''
-        for token in clean_text:
-            # TODO: only covers english text atm and assumes it's prefixed by "(e." as is by convention
-            # For token based cleaning, we don't have the context for inserting opening and closing ssml-tags
-            # Will be handled in the manager
-            #if token.strip() == EN_LABEL:
-            #    cleaned_text += self.clean_labelled_translation(token)
-            if token in self.preserve_strings or token.strip('r'+COMMON_PUNCT) in self.preserve_strings:
-                # TODO: is this defined somewhere? Why '"()'?
-                #token = re.sub(r'["()]', ' , ', token)
-                cleaned_text += token + ' '
-            elif re.match(URL_PATTERN, token):
-                # If not handled separately, the different punctuation symbols in a URL would be deleted/replaced
-                # and the token splitted. We don't want that, keep URLs as one token
-                # TODO: what about email?
-                cleaned_text += token + ' '
-            else:
-                cleaned_text += self.validate_characters(token)
+        clean_text = self.clean_tokens(clean_text)
+        return self.tidy_up(clean_text)
+
+    def iter_clean(self, texts, max_pending=MAX_PENDING_CHARS):
+        """
+        Streaming version of clean(): clean the text given in pieces by 'texts', e.g. the text of an html
+        document from HtmlCleaner.iter_clean_html(), and yield the cleaned text as soon as it is final, see
+        IncrementalCleaner. Joined, the yielded strings are the same as clean() of the joined texts, up to the
+        limit of 'max_pending'. The result cache is not used.
+
+        :param texts: an iterable of strings
+        :param max_pending: number of characters held back at most before the text is cut at a whitespace
+        :return: a generator of the cleaned text, in pieces
+        """
+        incremental = IncrementalCleaner(self, max_pending)
+        for text in texts:
+            cleaned = incremental.feed(text)
+            if cleaned:
+                yield cleaned
+        cleaned = incremental.flush()
+        if cleaned:
+            yield cleaned
+
+    def iter_sentences(self, texts, min_clause_words=None, max_pending=MAX_PENDING_CHARS):
+        """
+        Low-latency version of iter_clean(): clean the text given in pieces by 'texts' and yield the cleaned text
+        in sentences, each one as soon as its end is known, see SentenceEmitter. Joined, the yielded sentences are
+        the same as clean() of the joined texts, up to the limit of 'max_pending'.
+
+        :param texts: an iterable of strings
+        :param min_clause_words: if given, also yield clauses of at least this many words
+        :param max_pending: number of characters held back at most before the text is cut at a whitespace
+        :return: a generator of the cleaned sentences
+        """
+        emitter = SentenceEmitter(self, min_clause_words, max_pending)
+        for text in texts:
+            yield from emitter.feed(text)
+        yield from emitter.flush()
+
+    def clean_batch(self, texts) -> list:
+        """
+        Clean each text of 'texts', the result is the same as calling clean() on each text in turn.
+        Emojis are processed in one pass over the whole batch, as is the final tidying up of the cleaned
+        texts. To keep the texts apart, they are joined with BATCH_SEPARATOR, if that character occurs in
+        the input (or is produced by the configured replacements), the texts are cleaned one by one.
+        With a result cache, only the texts not found in the cache are cleaned.
+
+        :param texts: an iterable of strings to clean
+        :return: a list of the cleaned texts, in the same order as 'texts'
+        """
+        texts = list(texts)
+        if self.result_cache is None:
+            return self.clean_batch_uncached(texts)
+        return merge_cached_results(self.result_cache, self.fingerprint(), texts, self.clean_batch_uncached)
+
+    def clean_batch_uncached(self, texts: list) -> list:
+        """
+        Same as clean_batch(), without looking up the result cache.
+        """
+        batch = BATCH_SEPARATOR.join(texts)
+        if not texts or batch.count(BATCH_SEPARATOR) != len(texts) - 1 or BATCH_SEPARATOR in self.emoji_replacement:
+            return [self.clean_uncached(text) for text in texts]
+        batch = self.process_emojis(batch)
+        batch = BATCH_SEPARATOR.join([self.clean_tokens(text) for text in batch.split(BATCH_SEPARATOR)])
+        if batch.count(BATCH_SEPARATOR) != len(texts) - 1:
+            return [self.clean_uncached(text) for text in texts]
+        return [text.strip() for text in self.tidy_up(batch).split(BATCH_SEPARATOR)]
+
+    def clean_tokens(self, text: str) -> str:
+        """
+        Split 'text' into tokens and clean each token, see clean_token(). The cleaned tokens are
+        joined, but not yet tidied up, see tidy_up().
+        """
+        return ''.join([self.clean_token(token) for token in self.iter_tokens(text)])
 
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
-        cleaned_text = re.sub(r'\n+', ' ', cleaned_text)
-        cleaned_text = self.remove_consecutive_punctuation(cleaned_text)
+    def clean_token(self, token: str) -> str:
+        """
+        Clean one token, preserving URLs and the strings in 'self.preserve_strings'.
+        Return the cleaned token followed by a space.
+        """
+        # TODO: only covers english text atm and assumes it's prefixed by "(e." as is by convention
+        # For token based cleaning, we don't have the context for inserting opening and closing ssml-tags
+        # Will be handled in the manager
+        #if token.strip() == EN_LABEL:
+        #    return self.clean_labelled_translation(token)
+        if token in self.preserve_strings or token.strip('r'+COMMON_PUNCT) in self.preserve_strings:
+            # TODO: is this defined somewhere? Why '"()'?
+            #token = re.sub(r'["()]', ' , ', token)
+            return token + ' '
+        elif URL_REGEX.match(token):
+            # If not handled separately, the different punctuation symbols in a URL would be deleted/replaced
+            # and the token splitted. We don't want that, keep URLs as one token
+            # TODO: what about email?
+            return token + ' '
+        return self.validate_characters(token)
 
-        return cleaned_text.strip()
+    @staticmethod
+    def tidy_up(text: str) -> str:
+        """
+        Collapse whitespaces, remove consecutive punctuation and strip the cleaned text.
+        Splitting and joining the text collapses and strips all whitespaces in one pass, after which
+        consecutive punctuation marks are at most one space apart and removed in a second pass.
+        """
+        return SPACED_CONSECUTIVE_PUNCTUATION.sub(r'\1', ' '.join(text.split()))
 
     def process_emojis(self, text: str) -> str:
         """
@@ -187,7 +363,9 @@ class TextCleaner:
         """
         Replace emojis in text. Emojis are defined in emoji_dictionary.py, if no replacement is given,
         we replace each emoji by its value in the emoji_dictionary. Otherwise, replace each emoji
-        by replacement
+        by replacement. Emoji sequences are matched longest first in one pass over the text,
+        see emoji_matcher.py. A text without any codepoint an emoji could be built from is returned
+        unchanged, see 'emoji_fast_path_count' and 'emoji_scan_count' for statistics.
 
         Note: we don't offer the possibility to delete emojis without a trace, i.e. without at least replacing
         them by a '.' . We might add that possibility later if it turns out to be useful.
@@ -196,13 +374,64 @@ class TextCleaner:
         :param replacement: if not empty, replace each emoji in text with this string
         :return: a text without emojis, replaced either by emoji descriptions or by param replacement
         """
-        for emoji in emoji_dictionary.EMOJI_PATTERN:
-            if emoji in text and emoji not in self.preserve_strings:
-                if replacement:
-                    text = text.replace(emoji, replacement)
-                else:
-                    text = text.replace(emoji, emoji_dictionary.EMOJI_PATTERN[emoji])
-        return text
+        # the emoji dictionary is only loaded for text with a codepoint of the emoji blocks
+        if not emoji_matcher.may_contain_emoji(text):
+            self.emoji_fast_path_count += 1
+            return text
+        matcher = emoji_matcher.get_default_matcher()
+        if not matcher.may_contain_emoji(text):
+            self.emoji_fast_path_count += 1
+            return text
+        self.emoji_scan_count += 1
+
+        def replace_emoji(match) -> str:
+            emoji = match.group()
+            if emoji in self.preserve_strings:
+                return emoji
+            if replacement:
+                return replacement
+            return matcher.patterns[emoji]
+
+        return matcher.sub(replace_emoji, text)
+
+    def compile_char_table(self) -> None:
+        """
+        Compile the character rules of validate_characters() into one translation table, see CharTable.
+        The replacements and every character they produce are compiled right away, other characters
+        are added to the table the first time we see them.
+
+        Translating a token in one pass only gives the same result as replacing one character after the other,
+        if the characters inserted by a replacement are left untouched by the rules. Replacements inserting
+        characters that would be replaced or dropped in turn are collected in 'self.chained_replacements',
+        tokens containing one of those are validated character by character.
+        """
+        self.char_table = CharTable(self.char_rule)
+        # characters produced by a replacement are never dropped, see replace_or_drop()
+        self.replacement_values = set(self.replacement_dictionary.values())
+        for char in list(self.replacement_dictionary) + list(self.post_dict_lookup):
+            # longer keys never match the single characters validated
+            if len(char) == 1:
+                self.char_table[ord(char)] = self.char_rule(char)
+        self.chained_replacements = set()
+        for codepoint, replacement in list(self.char_table.items()):
+            for char in replacement:
+                if self.char_table[ord(char)] != char:
+                    self.chained_replacements.add(chr(codepoint))
+
+    def char_rule(self, char: str) -> str:
+        """
+        Return the replacement for a single character according to the rules in validate_characters(): 'char'
+        itself if it is valid, a replacement string, or an empty string if 'char' is to be deleted.
+        """
+        repl = self.replacement_dictionary[char] if char in self.replacement_dictionary else ''
+        if repl:
+            return repl
+        elif char.isdigit() or char.lower() in self.alphabet or char in self.preserved_punctuation:
+            return char
+        elif is_emoji(char):
+            # We have already taken care of emojis
+            return char
+        return self.replace_or_drop(char, char)
 
     def validate_characters(self, token: str) -> str:
         """
@@ -210,16 +439,40 @@ class TextCleaner:
         if it matches any predefined character, as defined
         in constants or the second input 'string_to_preserve'.
         """
+        if self.token_cache is None:
+            return self.translate_characters(token)
+        cleaned = self.token_cache.get(token)
+        if cleaned is None:
+            cleaned = self.translate_characters(token)
+            self.token_cache.put(token, cleaned)
+        return cleaned
+
+    def translate_characters(self, token: str) -> str:
+        """
+        Uncached version of validate_characters(): translate the token in one pass with the compiled
+        character table.
+        """
+        if self.char_table is None:
+            self.compile_char_table()
+        if self.chained_replacements and not self.chained_replacements.isdisjoint(token):
+            return self.validate_characters_sequentially(token)
+        return token.translate(self.char_table) + ' '
+
+    def validate_characters_sequentially(self, token: str) -> str:
+        """
+        Same as validate_characters(), but checks and replaces one character after the other, so that
+        the output of a replacement is subject to the rules of the characters following in the token.
+        """
         for char in token:
             repl = self.replacement_dictionary[char] if char in self.replacement_dictionary else ''
             if repl:
                 token = token.replace(char, repl)
-            elif char.isdigit():
+            elif char.isdigit() or char.lower() in self.alphabet or char in self.preserved_punctuation:
                 continue
-            elif char in emoji_dictionary.EMOJI_PATTERN:
+            elif is_emoji(char):
                 # We have already taken care of emojis
                 continue
-            elif char.lower() not in self.alphabet and char not in self.preserved_punctuation:
+            else:
                 token = self.replace_or_drop(char, token)
 
         return token + ' '
@@ -232,7 +485,7 @@ class TextCleaner:
             # again: where do these symbols come from?
             # token = token.replace(char, " , ")
             pass
-        elif char not in self.preserved_punctuation and char not in self.replacement_dictionary.values():
+        elif char not in self.preserved_punctuation and char not in self.replacement_values:
             token = token.replace(char, '')
 
         return token
@@ -259,6 +512,43 @@ class TextCleaner:
         else:
             return self.labelled_translation_to_ssml(token)
 
+    def fingerprint(self) -> str:
+        """
+        Return a stable hash of the configuration of this TextCleaner: two TextCleaners with the same
+        fingerprint clean every text the same way, in this and in any other process.
+        """
+        if self.config_fingerprint is None:
+            config = {
+                'replacement_dictionary': sorted(self.replacement_dictionary.items()),
+                'post_dict_lookup': sorted(self.post_dict_lookup.items()),
+                'alphabet': sorted(self.alphabet),
+                'preserved_punctuation': sorted(self.preserved_punctuation),
+                'preserve_strings': sorted(self.preserve_strings),
+                'preserve_emojis': self.preserve_emojis,
+                'describe_emojis': self.describe_emojis,
+                'emoji_replacement': self.emoji_replacement,
+                'delete_translations': self.delete_translations,
+            }
+            serialized = json.dumps(config, ensure_ascii=False, sort_keys=True)
+            self.config_fingerprint = hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+        return self.config_fingerprint
+
+    def result_cache_info(self):
+        """
+        Return the statistics of the result cache as a cache.CacheInfo, or None if there is no result cache.
+        """
+        if self.result_cache is None:
+            return None
+        return self.result_cache.info()
+
+    def token_cache_info(self):
+        """
+        Return the statistics of the token cache as a cache.CacheInfo, or None if the cache is disabled.
+        """
+        if self.token_cache is None:
+            return None
+        return self.token_cache.info()
+
     def update_replacement_dictionary(self, custom_replacements: dict) -> None:
         """
         Adds the custom_replacements to the collection of character
@@ -266,17 +556,338 @@ class TextCleaner:
         """
         if type(custom_replacements) is dict:
             self.replacement_dictionary.update(custom_replacements)
+            # recompiled on next use
+            self.char_table = None
+            self.config_fingerprint = None
+            if self.token_cache is not None:
+                self.token_cache.clear()
         else:
             logging.warning("Param 'custom_replacement' should be a dictionary, but is a " +
                             str(type(custom_replacements)) + ". Did not update replacement_dictionary")
 
 
 
+class IncrementalCleaner:
+    """
+    Cleans a text fed in pieces with a TextCleaner, returning the cleaned text up to the last position where the
+    text can be cut: the joined results are the same as TextCleaner.clean() of the whole text.
+
+    The text is cut at whitespaces, where no emoji can be matched and the text is split into tokens: emojis are
+    processed up to the last whitespace fed so far and the processed text is tokenized and cleaned up to its last
+    whitespace followed by an opening parenthesis before any closing one, see TextCleaner.iter_tokens(). Text
+    after a whitespace is held back until the next parenthesis is known, a closing one would keep the tokens
+    before it together. The cleaned tokens are tidied up as in TextCleaner.tidy_up(), holding back trailing
+    punctuation marks, which may be followed by more.
+
+    To keep the text held back and the latency bounded, the processed text is cut at its last whitespace anyway
+    once it is longer than 'max_pending' characters. The result then differs from TextCleaner.clean() only if a
+    closing parenthesis follows that whitespace, with no opening one in between.
+    """
+
+    def __init__(self, text_cleaner: TextCleaner, max_pending=MAX_PENDING_CHARS):
+        """
+        :param text_cleaner: the TextCleaner cleaning the text
+        :param max_pending: number of processed characters held back at most before the text is cut
+        """
+        self.text_cleaner = text_cleaner
+        self.max_pending = max_pending
+        # the pieces of the text fed after the last whitespace, its emojis not processed yet
+        self.raw = []
+        # the pieces of the processed text not yet tokenized and their length, the positions of the last
+        # parenthesis and the last whitespace in it, and of the last whitespace followed by an opening
+        # parenthesis, where it can be cut
+        self.pending = []
+        self.pending_size = 0
+        self.last_parenthesis = -1
+        self.last_whitespace = -1
+        self.cut = 0
+        # the tidied text not returned yet, punctuation marks and spaces, and if any text has been tidied
+        self.tail = ''
+        self.started = False
+
+    def feed(self, text: str) -> str:
+        """
+        Add 'text' and return the cleaned text up to the last position where the text can be cut.
+        """
+        # the text fed before has no whitespace after the first character
+        match = LAST_WHITESPACE.match(text)
+        if match is None:
+            self.raw.append(text)
+            return ''
+        self.raw.append(text[:match.end() - 1])
+        raw = ''.join(self.raw)
+        self.raw = [text[match.end() - 1:]]
+        if not raw:
+            return ''
+        self.add_processed(self.text_cleaner.process_emojis(raw))
+        cut = self.cut
+        if self.pending_size - cut > self.max_pending:
+            cut = max(self.last_whitespace, 0)
+        if cut == 0:
+            return ''
+        pending = ''.join(self.pending)
+        cleaned = self.text_cleaner.clean_tokens(pending[:cut])
+        self.pending = [pending[cut:]]
+        self.pending_size -= cut
+        self.last_parenthesis -= cut
+        self.last_whitespace -= cut
+        self.cut = 0
+        return self.tidy_up(cleaned)
+
+    def flush(self) -> str:
+        """
+        Return the rest of the cleaned text, the next text fed is the start of a new text.
+        """
+        self.pending.append(self.text_cleaner.process_emojis(''.join(self.raw)))
+        cleaned = self.text_cleaner.clean_tokens(''.join(self.pending))
+        text = self.tidy_up(cleaned) + SPACED_CONSECUTIVE_PUNCTUATION.sub(r'\1', self.tail)
+        self.__init__(self.text_cleaner, self.max_pending)
+        return text
+
+    def add_processed(self, processed: str) -> None:
+        """
+        Add a piece of processed text and track its parentheses and whitespaces: the whitespaces between the last
+        parenthesis and an opening one are split points, whatever follows.
+        """
+        offset = self.pending_size
+        for match in PARENTHESIS.finditer(processed):
+            if match.group() == '(':
+                start = max(self.last_parenthesis + 1 - offset, 0)
+                whitespace = LAST_WHITESPACE.match(processed, start, match.start())
+                if whitespace is not None:
+                    self.cut = offset + whitespace.end() - 1
+                elif self.last_whitespace > self.last_parenthesis:
+                    self.cut = self.last_whitespace
+            self.last_parenthesis = offset + match.start()
+        whitespace = LAST_WHITESPACE.match(processed)
+        if whitespace is not None:
+            self.last_whitespace = offset + whitespace.end() - 1
+        self.pending.append(processed)
+        self.pending_size += len(processed)
+
+    def tidy_up(self, cleaned: str) -> str:
+        """
+        Tidy up the cleaned tokens as TextCleaner.tidy_up() does, up to the trailing punctuation marks.
+        """
+        normalized = ' '.join(cleaned.split())
+        if not normalized:
+            return ''
+        text = self.tail + ' ' + normalized if self.started else normalized
+        self.started = True
+        final = text.rstrip(COMMON_PUNCT + ' ')
+        self.tail = text[len(final):]
+        return SPACED_CONSECUTIVE_PUNCTUATION.sub(r'\1', final)
+
+
+class SentenceEmitter:
+    """
+    Cleans a text fed in pieces with a TextCleaner, see IncrementalCleaner, and returns the cleaned text in
+    segments, sentences and optionally clauses, each one as soon as the word after it has been cleaned: joined, the
+    segments are the same as TextCleaner.clean() of the whole text, each one ends with the space before the next.
+
+    A sentence ends at '.', '?' or '!' followed by an uppercase letter, possibly after opening quotes or a
+    parenthesis, so that abbreviations and ordinals as in 't.d. þetta' or '4. maí' do not end one. A clause ends at
+    ',', ';' or ':' when it has at least 'min_clause_words' words. No segment ends within a parenthesis, nor before
+    it is closed, as in 'heilbrigðis (e. Salutogenesis. Sjá) vera', and segments without a word are not split off.
+    A segment longer than 'max_pending' characters is cut at its last space, e.g. within a parenthesis that is
+    never closed.
+    """
+
+    def __init__(self, text_cleaner: TextCleaner, min_clause_words=None, max_pending=MAX_PENDING_CHARS):
+        """
+        :param text_cleaner: the TextCleaner cleaning the text
+        :param min_clause_words: if given, also split clauses of at least this many words off the sentences
+        :param max_pending: number of characters held back at most, see IncrementalCleaner
+        """
+        self.incremental = IncrementalCleaner(text_cleaner, max_pending)
+        self.min_clause_words = min_clause_words
+        # the cleaned text not returned yet, the part of it scanned for segment ends and the parenthesis depth there
+        self.buffer = ''
+        self.scanned = 0
+        self.depth = 0
+
+    def feed(self, text: str) -> list:
+        """
+        Add 'text' and return the list of the segments ended by it.
+        """
+        self.buffer += self.incremental.feed(text)
+        return self.split_segments()
+
+    def flush(self) -> list:
+        """
+        Return the list of the remaining segments, the next text fed is the start of a new text.
+        """
+        self.buffer += self.incremental.flush()
+        segments = self.split_segments()
+        if self.buffer:
+            segments.append(self.buffer)
+        self.__init__(self.incremental.text_cleaner, self.min_clause_words, self.incremental.max_pending)
+        return segments
+
+    def split_segments(self) -> list:
+        """
+        Split the segments whose ends are known off the cleaned text not returned yet.
+        """
+        segments = []
+        start = 0
+        for match in SEGMENT_BOUNDARY.finditer(self.buffer, self.scanned):
+            if match.group(1) is None:
+                self.depth = self.depth + 1 if match.group() == '(' else max(self.depth - 1, 0)
+                continue
+            following = SEGMENT_START.match(self.buffer, match.end())
+            if following is None:
+                # the next word has not been cleaned yet, scan this boundary again
+                self.scanned = match.start()
+                break
+            if self.depth == 0 and self.is_segment_end(self.buffer[start:match.start()], match.group(1),
+                                                       following.group(1)):
+                segments.append(self.buffer[start:match.end()])
+                start = match.end()
+        else:
+            # a punctuation mark at the end may be followed by a space
+            self.scanned = len(self.buffer.rstrip(COMMON_PUNCT[:-2]))
+        if self.scanned - start > self.incremental.max_pending:
+            end = self.buffer.rfind(' ', start, self.scanned) + 1
+            if end > start:
+                segments.append(self.buffer[start:end])
+                start = end
+        self.buffer = self.buffer[start:]
+        self.scanned -= start
+        return segments
+
+    def is_segment_end(self, segment: str, punctuation: str, following: str) -> bool:
+        """
+        Return True if 'segment', ending with 'punctuation' followed by the character 'following', is a sentence,
+        or a clause to split off.
+        """
+        if not WORD.search(segment):
+            return False
+        if punctuation in SENTENCE_END:
+            return following.isupper()
+        return self.min_clause_words is not None and len(segment.split()) >= self.min_clause_words
+
+
+def is_emoji(char: str) -> bool:
+    """
+    Return True if 'char' is an emoji of the emoji dictionary, which is only loaded for the codepoints of the
+    emoji blocks, see emoji_matcher.may_contain_emoji().
+    """
+    return emoji_matcher.may_contain_emoji(char) and char in emoji_matcher.get_emoji_patterns()
+
+
+def merge_cached_results(result_cache, fingerprint: str, texts: list, clean_missing) -> list:
+    """
+    Look up the cleaned 'texts' in 'result_cache' in one batch, clean the texts not found with 'clean_missing'
+    and store their results in the cache.
+
+    :param clean_missing: a function returning the list of cleaned texts for a list of texts
+    :return: a list of the cleaned texts, in the same order as 'texts'
+    """
+    keys = [(fingerprint, text) for text in texts]
+    results = result_cache.get_many(keys)
+    missing = [i for i, cleaned in enumerate(results) if cleaned is None]
+    if missing:
+        missing_results = clean_missing([texts[i] for i in missing])
+        for i, cleaned in zip(missing, missing_results):
+            results[i] = cleaned
+        result_cache.put_many([(keys[i], results[i]) for i in missing])
+    return results
+
+
+def iter_chunks(lines, chunksize: int):
+    """
+    Yield lists of up to 'chunksize' consecutive elements of 'lines'.
+    """
+    lines = iter(lines)
+    chunk = list(itertools.islice(lines, chunksize))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(lines, chunksize))
+
+
+def clean_parallel(lines, workers=None, chunksize=DEFAULT_CHUNKSIZE, result_cache=None, **cleaner_args):
+    """
+    Clean 'lines' in a pool of worker processes, each worker cleans chunks of 'chunksize' lines with its own
+    TextCleaner, initialized with 'cleaner_args'. The cleaned lines are yielded in the order of 'lines'.
+    Only a few chunks per worker are in flight at a time, so 'lines' can be an iterator over a large file.
+
+    :param lines: an iterable of strings to clean
+    :param workers: number of worker processes, default is the number of CPUs. If 1, clean in this process
+    :param chunksize: number of lines per chunk
+    :param result_cache: a result cache as for TextCleaner, it is only accessed from this process. Only the lines
+                        not found in the cache are sent to the workers
+    :param cleaner_args: keyword arguments for TextCleaner
+    :return: a generator of the cleaned lines
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        cleaner = TextCleaner(result_cache=result_cache, **cleaner_args)
+        for chunk in iter_chunks(lines, chunksize):
+            yield from cleaner.clean_batch(chunk)
+        return
+    cleaner = TextCleaner(**cleaner_args)
+    if result_cache is not None:
+        fingerprint = cleaner.fingerprint()
+    # each worker process cleans with its own copy of the cleaner
+    clean_chunk = parallel.with_state(TextCleaner.clean_batch)
+    with parallel.start_pool(workers, cleaner) as pool:
+        pending = collections.deque()
+        for chunk in iter_chunks(lines, chunksize):
+            if result_cache is None:
+                pending.append(pool.apply_async(clean_chunk, (chunk,)))
+            else:
+                pending.append(PendingChunk(pool, clean_chunk, chunk, result_cache, fingerprint))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+class PendingChunk:
+    """
+    A chunk of clean_parallel() with a result cache: the cached lines are looked up at once, the others are
+    cleaned by the pool and stored in the cache when the chunk is collected with get().
+    """
+
+    def __init__(self, pool, clean_chunk, chunk: list, result_cache, fingerprint: str):
+        self.chunk = chunk
+        self.result_cache = result_cache
+        self.fingerprint = fingerprint
+        self.missing = None
+        self.results = result_cache.get_many([(fingerprint, line) for line in chunk])
+        missing_lines = [line for line, cleaned in zip(chunk, self.results) if cleaned is None]
+        if missing_lines:
+            self.missing = pool.apply_async(clean_chunk, (missing_lines,))
+
+    def get(self) -> list:
+        if self.missing is None:
+            return self.results
+        missing_results = iter(self.missing.get())
+        new_items = []
+        for i, cleaned in enumerate(self.results):
+            if cleaned is None:
+                self.results[i] = next(missing_results)
+                new_items.append(((self.fingerprint, self.chunk[i]), self.results[i]))
+        self.result_cache.put_many(new_items)
+        return self.results
+
+
+def iter_lines(infile):
+    """
+    Read 'infile' line by line and yield the lines as str.splitlines() splits the whole content of the file,
+    without the line breaks.
+    """
+    for line in infile:
+        yield from line.splitlines()
+
+
 def parse_arguments():
     parser = argparse.ArgumentParser()
     group = parser.add_mutually_exclusive_group()
     group.add_argument('--infile', '-i', nargs='?', type=argparse.FileType('r'), default=sys.stdin, help="Text file to be cleaned")
     group.add_argument('text', nargs='?', type=str, help='Input string to be cleaned')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help="Number of worker processes for cleaning a file")
+    parser.add_argument('--cache', type=str, default='', help="Cache file to keep the cleaned lines between runs")
     args = parser.parse_args()
     
     return args
@@ -292,12 +903,20 @@ def main():
         print("Please provide an input file or a string to be cleaned")
         raise ValueError("No input given")
     else:
-        file_content = args.infile.read().splitlines()
-        cleaned_arr = []
-        for line in file_content:
-            cleaned_arr.append(cleaner.clean(line))
-        for elem in cleaned_arr:
-            print(elem)
+        # stream the input: each line is written as soon as it is cleaned, through the buffer of sys.stdout
+        lines = iter_lines(args.infile)
+        result_cache = cache.SqliteCache(args.cache) if args.cache else None
+        try:
+            if args.jobs > 1 or result_cache is not None:
+                cleaned_lines = clean_parallel(lines, workers=args.jobs, result_cache=result_cache)
+            else:
+                cleaned_lines = (cleaner.clean(line) for line in lines)
+            for line in cleaned_lines:
+                sys.stdout.write(line + '\n')
+        finally:
+            # keep the results stored so far, also when the output is closed or the run is interrupted
+            if result_cache is not None:
+                result_cache.close()
 
 
 if __name__ == '__main__':
@@ -1,10 +1,24 @@
 import argparse
+import codecs
+import collections
+import contextlib
+import glob
+import hashlib
+import html.parser
+import io
+import itertools
+import json
+import mmap
+import os
 import re
+import sys
+import time
 from typing import Union, TextIO
-from bs4 import BeautifulSoup as beautiful_soup, element
+from bs4 import BeautifulSoup as beautiful_soup, SoupStrainer, element
 
-import text_cleaner
+from text_cleaner import cache
 from text_cleaner import constants as consts
+from text_cleaner import parallel
 
 PUNCTUATION = '[,.:;?!]'
 # HTML
@@ -12,6 +26,56 @@ TOP_TABLE_ELEM = 'table'
 TABLE_ROW = 'tr'
 TABLE_HEADER = 'th'
 TABLE_CELL = 'td'
+TABLE_HEAD = 'thead'
+# the largest colspan and rowspan values of a table cell, as in browsers
+MAX_COLSPAN = 1000
+MAX_ROWSPAN = 65534
+# the strings of a BeautifulSoup tree that are part of the text returned by get_text(), see TableWriter
+TEXT_TYPES = (str, element.NavigableString, element.CData)
+# elements without content, closed right after their start tag (as in BeautifulSoup)
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta',
+                 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+                 'nextid', 'spacer'}
+# elements whose text is not part of the text returned by BeautifulSoup's get_text()
+HIDDEN_TEXT_ELEMENTS = {'script', 'style', 'template'}
+# elements removed with all their content before the text is extracted, see HtmlCleaner.prune_elements()
+PRUNED_ELEMENTS = ('script', 'style', 'nav')
+# elements in which text consisting of whitespaces only is kept as it is
+PRESERVE_WHITESPACE_ELEMENTS = {'pre', 'textarea'}
+ASCII_WHITESPACE = ' \n\t\x0c\r'
+# attributes with a list of values separated by whitespace, e.g. class="content-text main"
+MULTI_VALUED_ATTRIBUTES = {'class', 'rel', 'rev', 'accept-charset', 'headers', 'accesskey', 'dropzone'}
+# number of characters read and parsed at a time by HtmlCleaner.iter_clean_html()
+STREAM_CHUNK_SIZE = 65536
+# number of bytes at the start of an html document searched for its encoding, as in the HTML standard
+ENCODING_SCAN_SIZE = 1024
+# encoding of html without a byte order mark or a declared encoding
+DEFAULT_ENCODING = 'utf-8'
+# byte order marks and the encodings decoding them
+BYTE_ORDER_MARKS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+XML_DECLARATION_ENCODING = re.compile(rb'<\?xml\s[^>]*?encoding\s*=\s*["\']([A-Za-z0-9._:-]+)')
+META_CHARSET = re.compile(rb'<meta\s[^>]*?charset\s*=\s*["\']?\s*([A-Za-z0-9._:-]+)', re.IGNORECASE)
+# html files of at least this size are memory-mapped rather than read, see open_html_file()
+MMAP_MIN_SIZE = 64 * 1024 * 1024
+# the elements yielded as segments by HtmlCleaner.iter_segments(): the sentences of an accessible EPUB
+SEGMENT_ATTRS = {'class': 'sentence'}
+# the start of a segment that is added to the segment before it, e.g. tag replacements
+SEGMENT_GAP = re.compile(r'(?:\s|' + PUNCTUATION + ')*')
+# consecutive punctuation marks, with or without whitespaces in between, and runs of newlines and of spaces,
+# replaced by the first punctuation mark, newline or space in one pass in tidy_up_text_format()
+TIDY_UP = re.compile('(' + PUNCTUATION + r')(?:\s*' + PUNCTUATION + r')+|(\n)\n+|( ) +')
+# the last full-stop/comma followed by a whitespace on a line, see clean_up_urls()
+URL_END = re.compile(r'.*([.,])\s')
+# a newline followed by a character that can not be part of the same match of any of the regular expressions in
+# tidy_up_text_format(), see TextTidier
+TIDY_CUT = re.compile(r'\n(?=[^\s\\,.:;?!])')
+# the last position in a text between two characters that can not be part of any match of the regular expressions
+# in tidy_up_text_format(), see TextTidier
+MID_LINE_CUT = re.compile(r'.*[^\s\\,.:;?!](?=[^\s\\,.:;?!])', re.DOTALL)
+# file extensions of the html documents found in directories by the command line tool, see find_html_files()
+HTML_EXTENSIONS = ('.html', '.htm', '.xhtml')
+# file in the output directory of the command line tool with the content hashes of the converted documents
+HASH_MANIFEST = '.clean_html_hashes.json'
 
 
 class HtmlCleaner:
@@ -21,13 +85,22 @@ class HtmlCleaner:
     parse the accessible EPUB-format.
     """
 
-    def __init__(self, tag_replacements={}, content_parent_div={"class": "content-text"}, top_elem='div'):
+    def __init__(self, tag_replacements={}, content_parent_div={"class": "content-text"}, top_elem='div',
+                 result_cache=None, pruned_elements=PRUNED_ELEMENTS, use_mmap=None):
         """
         Sets the values for the parsing.
 
         :param tag_replacements: a dictionary of html-tags and their replacements. Default is in constants.py
-        :param content_parent_div: the parent div of the content of the html-doc
+        :param content_parent_div: the attributes of the parent div of the content of the html-doc, a string is
+                                a class, as in BeautifulSoup find()
         :param top_elem: top element to look for within the content_parent_div
+        :param pruned_elements: elements removed from the content with their text and tag replacements, by default
+                                scripts, styles and navigation, see prune_elements()
+        :param result_cache: a cache for the extracted texts, e.g. a cache.LRUCache or, to keep the texts between
+                                runs, a cache.SqliteCache. Texts are stored by the hash of the html together with
+                                the fingerprint() of the configuration, see cache_key()
+        :param use_mmap: if True, html files are memory-mapped for reading, if False they are read. By default,
+                                files of at least MMAP_MIN_SIZE bytes are memory-mapped, see open_html_file()
         """
         # a map of tags and their replacement strings
         if tag_replacements:
@@ -35,22 +108,49 @@ class HtmlCleaner:
         else:
             self.tag_replacements = consts.html_closing_tag_replacement
         # the parent div of the content of the html-document
+        if isinstance(content_parent_div, str):
+            content_parent_div = {'class': content_parent_div}
         self.content_parent_div = content_parent_div
         # top element to look for within content_parent_div
         self.top_elem = top_elem
+        self.pruned_elements = tuple(pruned_elements)
+        self.result_cache = result_cache
+        self.config_fingerprint = None
+        self.use_mmap = use_mmap
 
     def clean_html(self, html: str, from_file=False) -> str:
         """
         Parse the html and remove/replace html-tags, preparing for further text cleaning of the content.
-        :param html: an html string or filename
+        With a result cache, the text of html that has been cleaned before is returned from the cache, file objects
+        are not looked up in the cache. Html bytes and files are decoded with the encoding of their byte order mark
+        or their declared encoding, see detect_encoding().
+        :param html: an html string, html bytes, a filename or a file object
         :param from_file: if True, 'html' is a filename
         :return: plain text extracted from the html, with html tag replacements as defined in self.tag_replacements
         """
+        if not self.uses_result_cache() or not (from_file or isinstance(html, (str, bytes))):
+            return self.clean_html_uncached(html, from_file)
+        if from_file:
+            key = self.cache_key(file_hash(html))
+        else:
+            # the whole string is cleaned, not only the content element: the texts are kept apart
+            key = self.cache_key(content_hash(html), scope='string')
+        text = self.result_cache.get(key)
+        if text is None:
+            text = self.clean_html_uncached(html, from_file)
+            self.result_cache.put(key, text)
+        return text
+
+    def clean_html_uncached(self, html: str, from_file=False) -> str:
+        """
+        Same as clean_html(), without looking up the result cache.
+        """
         if from_file:
             html_soup = self.extract_html_from_file(html)
         else:
             html_soup = self.extract_html_from_string(html)
 
+        html_soup = self.prune_elements(html_soup)
         html_soup = self.clean_html_tables(html_soup)
         html_soup = self.append_punctuation_to_tag_content(html_soup)
 
@@ -59,39 +159,186 @@ class HtmlCleaner:
 
         return text
 
+    def iter_clean_html(self, html, from_file=False, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Streaming version of clean_html(): the html is parsed chunk by chunk with ContentStreamParser,
+        without building a tree of the document, and the text is yielded as soon as it is tidied up,
+        see TextTidier. Only tables are held in memory as a whole, each one until it is closed.
+
+        As with clean_html(html, from_file=True), only the text of the first 'top_elem' matching
+        'content_parent_div' is extracted, also for html strings. Joined, the yielded strings are the same
+        as the text returned by clean_html() for that element.
+
+        With a result cache, the text of an html string or file that has been cleaned before is yielded from
+        the cache at once, and the text of other html is stored when the generator is exhausted. File objects
+        are not looked up in the cache.
+
+        :param html: an html string, html bytes, a filename or a text or binary file object, see html_chunks()
+        :param from_file: if True, 'html' is a filename
+        :param chunk_size: number of characters, or bytes of binary html, to parse at a time
+        :return: a generator of the cleaned text, in pieces
+        """
+        if self.uses_result_cache() and (from_file or isinstance(html, (str, bytes))):
+            key = self.cache_key(file_hash(html) if from_file else content_hash(html))
+            text = self.result_cache.get(key)
+            if text is None:
+                pieces = []
+                for text in self.iter_clean_html_uncached(html, from_file, chunk_size):
+                    pieces.append(text)
+                    yield text
+                self.result_cache.put(key, ''.join(pieces))
+            elif text:
+                yield text
+            return
+        yield from self.iter_clean_html_uncached(html, from_file, chunk_size)
+
+    def iter_clean_html_uncached(self, html, from_file=False, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Same as iter_clean_html(), without looking up the result cache.
+        """
+        parser = ContentStreamParser(self.tag_replacements, self.content_parent_div, self.top_elem,
+                                     self.pruned_elements)
+        tidier = TextTidier()
+        # a file opened here is closed when the content element ends, not when the generator is collected
+        with contextlib.closing(html_chunks(html, from_file, chunk_size, self.use_mmap)) as chunks:
+            for chunk in chunks:
+                parser.feed(chunk)
+                text = tidier.feed(parser.pop_text())
+                if text:
+                    yield text
+                if parser.finished:
+                    break
+        parser.close()
+        text = tidier.feed(parser.pop_text()) + tidier.flush()
+        if text:
+            yield text
+
+    def iter_segments(self, html, from_file=False, segment_attrs=SEGMENT_ATTRS, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Extract the text of the content element like iter_clean_html(), in segments: the text of each element
+        matching 'segment_attrs', by default the sentences of an accessible EPUB, <span id="..." class="sentence">,
+        is yielded with the id of the element as soon as the element is closed, e.g. to synthesize the sentences
+        in parallel and align the audio to them.
+
+        Tables and tag replacements are written as in clean_html(), the tag replacement of the segment element
+        itself is part of its text. Text between segments is a segment without an id (None). Whitespaces and
+        punctuation at the start of a segment, e.g. the tag replacement of the paragraph before it, are added to
+        the segment before it. A table containing segments is one segment, with the id of the first one. The text
+        of each segment is tidied up on its own, segments without text are skipped. The result cache is not used.
+
+        :param html: an html string, html bytes, a filename or a text or binary file object, see html_chunks()
+        :param from_file: if True, 'html' is a filename
+        :param segment_attrs: the attributes of the segment elements, matched as 'content_parent_div'
+        :param chunk_size: number of characters, or bytes of binary html, to parse at a time
+        :return: a generator of (segment id, text) pairs, in document order
+        """
+        parser = ContentStreamParser(self.tag_replacements, self.content_parent_div, self.top_elem,
+                                     self.pruned_elements, segment_attrs)
+        with contextlib.closing(html_chunks(html, from_file, chunk_size, self.use_mmap)) as chunks:
+            yield from tidy_segments(parse_segments(parser, chunks))
+
+    def fingerprint(self):
+        """
+        Return a stable hash of the configuration of this HtmlCleaner: 'tag_replacements', 'content_parent_div',
+        'top_elem' and 'pruned_elements'. It is computed on first use, the configuration should not be changed
+        afterwards. Regular expressions are fingerprinted by their pattern and flags. A configuration with other
+        values JSON can not serialize, e.g. a function in 'content_parent_div', has no stable hash: the fingerprint
+        is None and the result cache is not used, see uses_result_cache().
+        """
+        if self.config_fingerprint is None:
+            config = {
+                'tag_replacements': self.tag_replacements,
+                'content_parent_div': self.content_parent_div,
+                'top_elem': self.top_elem,
+                'pruned_elements': self.pruned_elements,
+            }
+            try:
+                serialized = json.dumps(config, ensure_ascii=False, sort_keys=True, default=serialize_pattern)
+            except TypeError:
+                return None
+            self.config_fingerprint = hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+        return self.config_fingerprint
+
+    def uses_result_cache(self) -> bool:
+        """
+        Return True if there is a result cache and the configuration has a fingerprint() to look texts up by.
+        """
+        return self.result_cache is not None and self.fingerprint() is not None
+
+    def cache_key(self, html_hash: str, scope='content') -> tuple:
+        """
+        Return the key of the result cache for html with the SHA-256 'html_hash', see content_hash() and
+        file_hash(): (fingerprint, html_hash), where the fingerprint is that of the configuration followed by
+        the scope of the text, 'content' for the text of the content element, 'string' for the text of a
+        whole html string cleaned with clean_html().
+        """
+        return self.fingerprint() + '-' + scope, html_hash
+
+    def result_cache_info(self):
+        """
+        Return the statistics of the result cache as a cache.CacheInfo, or None if there is no result cache.
+        """
+        if self.result_cache is None:
+            return None
+        return self.result_cache.info()
+
     def extract_html_from_file(self, html_doc) -> element.Tag:
-        html_doc_content = open(html_doc)
-        soup = self.extract_html_from_string(html_doc_content)
+        """
+        Parse the first 'top_elem' matching 'content_parent_div' in the file 'html_doc'. Only the content elements
+        are built into a tree (see content_strainer()), the rest of the document is skipped while parsing.
+        The file is decoded before parsing, see read_html().
+        """
+        html = read_html(html_doc, self.use_mmap)
+        soup = beautiful_soup(html, features='html.parser', parse_only=self.content_strainer())
         return soup.find(self.top_elem, self.content_parent_div)
 
-    def extract_html_from_string(self, html_str: Union[str, TextIO]) -> element.Tag:
+    def content_strainer(self) -> SoupStrainer:
+        """
+        Return a SoupStrainer for the elements matching 'top_elem' and 'content_parent_div'. While parsing, the
+        strainer sees the attribute values as written in the document, a string value of 'content_parent_div'
+        therefore also matches one of several classes, as in find().
+        """
+        attrs = {}
+        for name, value in self.content_parent_div.items():
+            if isinstance(value, str):
+                attrs[name] = attribute_matcher(name, value)
+            else:
+                attrs[name] = value
+        return SoupStrainer(self.top_elem, attrs)
+
+    def prune_elements(self, soup) -> element.Tag:
+        """
+        Remove the 'pruned_elements' within 'soup', with their content, before any other processing.
+        """
+        for tag in soup.find_all(self.pruned_elements):
+            if not tag.decomposed:
+                tag.decompose()
+        return soup
+
+    def extract_html_from_string(self, html_str: Union[str, bytes, TextIO]) -> element.Tag:
+        """
+        Parse an html string or file object, html bytes and binary files are decoded first, see decode_html().
+        """
+        if hasattr(html_str, 'read'):
+            html_str = html_str.read()
+        if not isinstance(html_str, str):
+            html_str = decode_html(html_str)
         soup = beautiful_soup(html_str, features='html.parser')
         return soup
 
-    @staticmethod
-    def clean_html_tables(soup) -> element.Tag:
+    def clean_html_tables(self, soup) -> element.Tag:
         """
         Organizes text in tables to a more readable form for TTS engines.
-        This function does so by prepending a table header to each data
+        This function does so by prepending the table headers to each data
         cell in the same column and removes all original text in headers.
-        """
-        tables = soup.find_all(TOP_TABLE_ELEM)
 
-        for table in tables:
-            table_row = table.find_all(TABLE_ROW)
-            # used by each cell to reference it's header content
-            table_headers = table.find_all(TABLE_HEADER)
-
-            for row in table_row:
-                # list of cells for current row
-                table_cell = row.find_all(TABLE_CELL)
-                for idx2, cell in enumerate(table_cell):
-                    if idx2 < len(table_headers):
-                        cell = cell.insert_before(table_headers[idx2].get_text() + ': ')
-
-            # remove headers after they've been prepended to each cell in their column
-            for th in table_headers:
-                th.decompose()
+        Each table is written in one walk by a TableWriter, with its tag replacements, and replaced
+        by its text.
+        """
+        for table in soup.find_all(TOP_TABLE_ELEM):
+            # nested tables are written with the outermost one
+            if table.find_parent(TOP_TABLE_ELEM) is None:
+                table.replace_with(table_text(table, self.tag_replacements))
 
         return soup
 
@@ -99,27 +346,742 @@ class HtmlCleaner:
         """
         Appends a string to closing html tags as described
         by 'html_closing_tag_replacement' in constants.py
+
+        The tags are collected in one walk over the tree, before any string is appended.
         """
-        for tag in self.tag_replacements:
-            for text_within_tag in text_tag.find_all(tag):
-                text_within_tag.append(' ' + self.tag_replacements[tag] + ' ')
+        tags = [tag for tag in text_tag.descendants
+                if isinstance(tag, element.Tag) and tag.name in self.tag_replacements]
+        for tag in tags:
+            tag.append(' ' + self.tag_replacements[tag.name] + ' ')
 
         return text_tag
 
 
+class TableNode:
+    """
+    An element of a table buffered by ContentStreamParser, or of the text outside tables. The children, strings
+    and TableNodes, are only kept within tables, elsewhere 'children' is None.
+    """
+    __slots__ = ('name', 'parent', 'children', 'attrs')
+
+    def __init__(self, name: str, parent=None, children=None, attrs=None):
+        self.name = name
+        self.parent = parent
+        self.children = children
+        self.attrs = attrs
+
+    def get(self, name: str, default=None):
+        """
+        Return the value of the attribute 'name', as Tag.get() does.
+        """
+        if self.attrs is None:
+            return default
+        return self.attrs.get(name, default)
+
+    def descendants(self):
+        """
+        Yield the descendants of this node in document order.
+        """
+        for child in self.children:
+            yield child
+            if isinstance(child, TableNode):
+                yield from child.descendants()
+
+    def find_all(self, name: str) -> list:
+        return [node for node in self.descendants() if isinstance(node, TableNode) and node.name == name]
+
+    def get_text(self) -> str:
+        return ''.join(node for node in self.descendants() if isinstance(node, str))
+
+
+class ContentStreamParser(html.parser.HTMLParser):
+    """
+    Extracts the text of an html document as HtmlCleaner does, from the html fed to it in pieces: only the text of
+    the first 'top_elem' matching 'content_parent_div' is extracted, tag replacements are added when an element is
+    closed. Tables are collected as a tree of TableNodes and restructured as in HtmlCleaner.clean_html_tables()
+    when the table is closed. The text extracted so far is collected with pop_text().
+
+    Within the content element, elements are opened and closed like BeautifulSoup's html.parser tree builder
+    does when parsing only the content with HtmlCleaner.content_strainer(): an end tag closes the last open
+    element of that name and all elements opened after it, end tags without an open element are ignored, as are
+    comments and the text within script, style and template elements. The 'pruned_elements' are skipped with
+    their content. Only the names of the open elements are kept outside tables.
+
+    With 'segment_attrs', the extracted text is also split into segments at the elements matching them, which are
+    collected with pop_segments(), see HtmlCleaner.iter_segments().
+    """
+
+    def __init__(self, tag_replacements: dict, content_parent_div: dict, top_elem: str,
+                 pruned_elements=PRUNED_ELEMENTS, segment_attrs=None):
+        super().__init__(convert_charrefs=True)
+        self.tag_replacements = tag_replacements
+        self.content_parent_div = content_parent_div
+        self.top_elem = top_elem
+        self.pruned_elements = set(pruned_elements)
+        self.segment_attrs = segment_attrs
+        # the id and the number of open elements of the open segment, its element included
+        self.segment_id = None
+        self.segment_depth = None
+        # the id of the first segment in the open table, outside segments
+        self.table_segment_id = None
+        self.segments = []
+        # the open elements of the content, the content element first
+        self.open_elements = []
+        self.finished = False
+        # number of open elements hiding their text, preserving whitespaces, and pruned
+        self.hidden = 0
+        self.preserve_whitespace = 0
+        self.pruned = 0
+        self.data = []
+        self.text = []
+
+    def pop_text(self) -> str:
+        """
+        Return the text extracted since the last call.
+        """
+        text = ''.join(self.text)
+        self.text = []
+        return text
+
+    def pop_segments(self) -> list:
+        """
+        Return the (segment id, text) pairs of the segments ended since the last call, the text between segments
+        with the id None.
+        """
+        segments = self.segments
+        self.segments = []
+        return segments
+
+    def handle_starttag(self, tag, attrs):
+        self.end_data()
+        if self.finished:
+            return
+        if not self.open_elements and not (tag == self.top_elem and self.matches_content_parent(attrs)):
+            return
+        self.open_element(tag, attrs)
+        if tag in VOID_ELEMENTS:
+            self.close_element()
+
+    def handle_endtag(self, tag):
+        self.end_data()
+        if self.finished:
+            return
+        for i in range(len(self.open_elements) - 1, -1, -1):
+            if self.open_elements[i].name == tag:
+                while len(self.open_elements) > i:
+                    self.close_element()
+                return
+
+    def handle_data(self, data):
+        if self.open_elements:
+            self.data.append(data)
+
+    def handle_comment(self, data):
+        self.end_data()
+
+    def handle_decl(self, decl):
+        self.end_data()
+
+    def handle_pi(self, data):
+        self.end_data()
+
+    def unknown_decl(self, data):
+        # CDATA sections are text
+        self.end_data()
+        if data.startswith('CDATA['):
+            self.handle_data(data[len('CDATA['):])
+            self.end_data(cdata=True)
+
+    def close(self):
+        super().close()
+        self.end_data()
+        while self.open_elements:
+            self.close_element()
+        if self.segment_attrs is not None:
+            self.end_segment()
+
+    def matches_content_parent(self, attrs: list) -> bool:
+        """
+        Check the attributes of a 'top_elem' start tag against 'content_parent_div', see matches_attributes().
+        """
+        return matches_attributes(attrs, self.content_parent_div)
+
+    def start_segment(self, segment_id) -> None:
+        self.end_segment()
+        self.segment_id = segment_id
+        self.segment_depth = len(self.open_elements)
+
+    def end_segment(self) -> None:
+        """
+        End the open segment, or the text since the last one.
+        """
+        text = self.pop_text()
+        if text:
+            self.segments.append((self.segment_id, text))
+        self.segment_id = None
+        self.segment_depth = None
+
+    def open_element(self, tag: str, attrs: list) -> None:
+        parent = self.open_elements[-1] if self.open_elements else None
+        if self.pruned or (tag in self.pruned_elements and parent is not None):
+            # the text of pruned elements is dropped, their elements are not kept in a table
+            node = TableNode(tag)
+            self.pruned += 1
+        elif parent is not None and parent.children is not None:
+            node = TableNode(tag, parent, [], dict(attrs) if attrs else None)
+            parent.children.append(node)
+        elif tag == TOP_TABLE_ELEM:
+            node = TableNode(tag, parent, [], dict(attrs) if attrs else None)
+        else:
+            node = TableNode(tag)
+        self.open_elements.append(node)
+        if tag in HIDDEN_TEXT_ELEMENTS:
+            self.hidden += 1
+        if tag in PRESERVE_WHITESPACE_ELEMENTS:
+            self.preserve_whitespace += 1
+        if self.segment_attrs is not None and self.segment_depth is None and not self.pruned \
+                and matches_attributes(attrs, self.segment_attrs):
+            if node.children is None:
+                self.start_segment(dict(attrs).get('id'))
+            elif self.table_segment_id is None:
+                self.table_segment_id = dict(attrs).get('id')
+
+    def close_element(self) -> None:
+        node = self.open_elements.pop()
+        if node.name in HIDDEN_TEXT_ELEMENTS:
+            self.hidden -= 1
+        if node.name in PRESERVE_WHITESPACE_ELEMENTS:
+            self.preserve_whitespace -= 1
+        if not self.open_elements:
+            self.finished = True
+        if self.pruned:
+            self.pruned -= 1
+        elif node.children is None:
+            if node.name in self.tag_replacements:
+                self.text.append(' ' + self.tag_replacements[node.name] + ' ')
+        elif node.parent is None or node.parent.children is None:
+            # the outermost table is complete
+            if self.table_segment_id is None:
+                self.text.append(table_text(node, self.tag_replacements))
+            else:
+                # segments within a table are one segment, with the id of the first one
+                self.start_segment(self.table_segment_id)
+                self.text.append(table_text(node, self.tag_replacements))
+                self.end_segment()
+                self.table_segment_id = None
+        if self.segment_depth is not None and len(self.open_elements) < self.segment_depth:
+            self.end_segment()
+
+    def end_data(self, cdata=False) -> None:
+        """
+        Add the text since the last tag to the extracted text. As in BeautifulSoup, text consisting of ascii
+        whitespaces only is reduced to a newline, if it contains one, or a space, and CDATA sections are
+        text even within template elements.
+        """
+        if not self.data:
+            return
+        data = ''.join(self.data)
+        self.data = []
+        if (self.hidden and not cdata) or self.pruned:
+            return
+        if not self.preserve_whitespace and not data.strip(ASCII_WHITESPACE):
+            data = '\n' if '\n' in data else ' '
+        parent = self.open_elements[-1]
+        if parent.children is None:
+            self.text.append(data)
+        else:
+            parent.children.append(data)
+
+
+class HeaderGrid:
+    """
+    The column headers of a table, see TableWriter, and the columns taken by cells spanning several rows.
+    """
+    __slots__ = ('headers', 'spans', 'in_body')
+
+    def __init__(self):
+        # the texts of the header cells of each column, and the number of rows a column is still taken by a cell
+        # of a row above
+        self.headers = {}
+        self.spans = {}
+        self.in_body = False
+
+    def add_row(self, cells: list, header_row: bool) -> dict:
+        """
+        Place the cells of a row in the grid and return the prefix of each one by id(): None for the cells of a
+        header row, which are not written, the headers of its columns for a cell of another row.
+        """
+        if header_row and self.in_body:
+            # a header row after data rows starts new headers
+            self.headers = {}
+        self.in_body = not header_row and bool(cells)
+        prefixes = {}
+        new_spans = {}
+        column = 0
+        for cell in cells:
+            while self.spans.get(column):
+                column += 1
+            columns = range(column, column + span_value(cell.get('colspan'), MAX_COLSPAN))
+            if header_row:
+                text = ''.join(iter_text(cell))
+                for header_column in columns:
+                    self.headers.setdefault(header_column, []).append(text)
+                prefixes[id(cell)] = None
+            else:
+                prefixes[id(cell)] = self.prefix(columns)
+            rowspan = span_value(cell.get('rowspan'), MAX_ROWSPAN)
+            if rowspan > 1:
+                for span_column in columns:
+                    new_spans[span_column] = rowspan - 1
+            column = columns.stop
+        self.spans = {span_column: rows - 1 for span_column, rows in self.spans.items() if rows > 1}
+        self.spans.update(new_spans)
+        return prefixes
+
+    def prefix(self, columns: range) -> str:
+        """
+        Return 'header: ' for a data cell in 'columns', with the headers of the columns joined, or '' if the
+        columns have no headers.
+        """
+        texts = []
+        for column in columns:
+            for text in self.headers.get(column, ()):
+                if text not in texts:
+                    texts.append(text)
+        header = ' '.join(texts)
+        return header + ': ' if header.strip() else ''
+
+
+class TableWriter:
+    """
+    Writes the text of a table for TTS engines in one walk over it, see HtmlCleaner.clean_html_tables(). The
+    table is a BeautifulSoup Tag or a TableNode of ContentStreamParser.
+
+    The header rows of a table, rows within 'thead' and rows of header cells only, build a grid of column headers
+    (see HeaderGrid): a header spanning several columns ('colspan') is the header of each of them, the headers of
+    several header rows are joined for each column. Header rows are written without their cells. Each data cell
+    is written prefixed with the headers of its columns, 'header: value', as is a header cell in a row with data
+    cells, a row header. Cells spanning several rows ('rowspan') take their columns in the rows
+    below. The tag replacements are added at the end of each element, nested tables have their own headers.
+    """
+
+    def __init__(self, tag_replacements: dict):
+        self.tag_replacements = tag_replacements
+        self.pieces = []
+
+    def text(self) -> str:
+        return ''.join(self.pieces)
+
+    def write_table(self, table) -> None:
+        self.write_children(table, HeaderGrid(), False, {})
+        self.close(table)
+
+    def write_children(self, node, grid: HeaderGrid, in_head: bool, prefixes: dict) -> None:
+        for child in node.children:
+            if isinstance(child, str):
+                if type(child) in TEXT_TYPES:
+                    self.pieces.append(child)
+                continue
+            if child.name == TOP_TABLE_ELEM:
+                self.write_table(child)
+                continue
+            child_prefixes = prefixes
+            if child.name == TABLE_ROW:
+                cells = row_cells(child)
+                header_row = in_head or (bool(cells) and all(cell.name == TABLE_HEADER for cell in cells))
+                child_prefixes = grid.add_row(cells, header_row)
+            elif id(child) in prefixes:
+                prefix = prefixes[id(child)]
+                if prefix is None:
+                    continue
+                self.pieces.append(prefix)
+            self.write_children(child, grid, in_head or child.name == TABLE_HEAD, child_prefixes)
+            self.close(child)
+
+    def close(self, node) -> None:
+        if node.name in self.tag_replacements:
+            self.pieces.append(' ' + self.tag_replacements[node.name] + ' ')
+
+
+def table_text(table, tag_replacements: dict) -> str:
+    """
+    Return the text of 'table', a BeautifulSoup Tag or a TableNode, restructured by a TableWriter.
+    """
+    writer = TableWriter(tag_replacements)
+    writer.write_table(table)
+    return writer.text()
+
+
+def row_cells(row) -> list:
+    """
+    Return the header and data cells of a table row, in document order, without the cells of nested tables
+    and rows.
+    """
+    cells = []
+    for child in row.children:
+        if isinstance(child, str):
+            continue
+        if child.name == TABLE_CELL or child.name == TABLE_HEADER:
+            cells.append(child)
+        elif child.name != TOP_TABLE_ELEM and child.name != TABLE_ROW:
+            cells.extend(row_cells(child))
+    return cells
+
+
+def iter_text(node):
+    """
+    Yield the strings of a Tag or TableNode that are part of its text, as in get_text().
+    """
+    for child in node.children:
+        if isinstance(child, str):
+            if type(child) in TEXT_TYPES:
+                yield child
+        else:
+            yield from iter_text(child)
+
+
+def span_value(value, maximum: int) -> int:
+    """
+    Return the number of columns or rows in a colspan or rowspan attribute, 1 if it is missing or invalid.
+    """
+    try:
+        span = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return min(max(span, 1), maximum)
+
+
+class TextTidier:
+    """
+    Streaming version of tidy_up_text_format(): the text is fed in pieces and tidied up in segments, the joined
+    segments are the same as tidy_up_text_format() of the whole text.
+
+    The text is cut after newlines that are followed by a character other than a whitespace or punctuation mark:
+    no match of the regular expressions of tidy_up_text_format() spans such a position. Within a line, the text is
+    cut between two such characters before the first 'http' of the line, which may start a URL extending up to
+    the end of the line, see clean_up_urls(). Only the first segment is stripped at the start, and may start with
+    a URL beginning with 'www', which is not cut either. Only the last segment is stripped at the end.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.last_char = ''
+        self.at_start = True
+        # the end of the current line, to find an 'http' split between two pieces, and if it contains a URL
+        self.line_end = ''
+        self.url_line = False
+        # the start of the text while it is too short to tell if it starts with 'www', None after that
+        self.head = ''
+
+    def feed(self, text: str) -> str:
+        """
+        Add 'text' and return the tidied text up to the last position where the text can be cut.
+        """
+        if not text:
+            return ''
+        cut = -1
+        for match in TIDY_CUT.finditer(text):
+            cut = match.end()
+        if cut < 0 and self.last_char == '\n' and TIDY_CUT.match('\n' + text[0]):
+            cut = 0
+        cut = max(cut, self.mid_line_cut(text, cut))
+        self.last_char = text[-1]
+        if cut < 0:
+            self.pending.append(text)
+            return ''
+        self.pending.append(text[:cut])
+        segment = ''.join(self.pending)
+        self.pending = [text[cut:]]
+        return self.tidy_segment(segment, at_end=False)
+
+    def flush(self) -> str:
+        """
+        Return the rest of the tidied text, the next text fed is the start of a new text.
+        """
+        text = self.tidy_segment(''.join(self.pending), at_end=True)
+        self.__init__()
+        return text
+
+    def mid_line_cut(self, text: str, line_start: int) -> int:
+        """
+        Return the last position within the last line of 'text' where it can be cut, see the class docstring,
+        or -1 if there is none.
+
+        :param line_start: the start of the last line in 'text', after the last newline it can be cut at, or -1
+                           if the line started before 'text'. Other newlines may be removed by TIDY_UP
+        """
+        if line_start >= 0:
+            self.line_end = ''
+            self.url_line = False
+        line = text[max(line_start, 0):]
+        line_end = self.line_end + line
+        self.line_end = line_end[-len('htt'):]
+        if self.at_start and self.head is not None:
+            self.head = (self.head + text).lstrip()
+            head = self.head.replace('\\s\n', '\n').lstrip()
+            if len(head) >= len('www'):
+                self.head = None
+            # the text may start with a URL, on this line. Before that, the line is too short to contain 'http'
+            self.url_line = len(head) < len('www') or head.startswith('www')
+        if self.url_line:
+            return -1
+        url_start = line_end.find('http')
+        if url_start >= 0:
+            end = len(text) - len(line_end) + url_start
+            self.url_line = True
+        else:
+            # the text is not cut within the start of an 'http' completed by the next text
+            end = len(text) - max((size for size in (3, 2, 1) if line_end.endswith('http'[:size])), default=0)
+        match = MID_LINE_CUT.match(text, len(text) - len(line), end + 1)
+        if match:
+            return match.end()
+        if line_start < 0 and end >= 0 and MID_LINE_CUT.match(self.last_char + text[:1]):
+            return 0
+        return -1
+
+    def tidy_segment(self, text: str, at_end: bool) -> str:
+        text = TIDY_UP.sub(r'\1\2\3', text.replace('\\s\n', '\n'))
+        if self.at_start:
+            text = text.lstrip()
+        if at_end:
+            text = text.rstrip()
+        text = clean_up_urls(text, at_start=self.at_start)
+        if text:
+            self.at_start = False
+        return text
+
+
+def html_chunks(html, from_file=False, chunk_size=STREAM_CHUNK_SIZE, use_mmap=None):
+    """
+    Yield an html string, or the content of a filename, a text or binary file object or html bytes, in chunks of
+    'chunk_size' characters. Binary html is read 'chunk_size' bytes at a time and decoded, see decode_chunks().
+    A file opened here is closed when the generator is exhausted or closed.
+
+    :param use_mmap: if 'html' is a filename, whether to memory-map the file, see open_html_file()
+    """
+    if from_file:
+        with open_html_file(html, use_mmap) as html_file:
+            yield from html_chunks(html_file, chunk_size=chunk_size)
+        return
+    if isinstance(html, str):
+        yield from (html[start:start + chunk_size] for start in range(0, len(html), chunk_size))
+    elif isinstance(html, (bytes, bytearray, memoryview, mmap.mmap)):
+        yield from decode_chunks(html[start:start + chunk_size] for start in range(0, len(html), chunk_size))
+    else:
+        chunk = html.read(chunk_size)
+        if isinstance(chunk, str):
+            yield chunk
+            yield from iter(lambda: html.read(chunk_size), '')
+        else:
+            yield from decode_chunks(itertools.chain([chunk], iter(lambda: html.read(chunk_size), b'')))
+
+
+@contextlib.contextmanager
+def open_html_file(filename: str, use_mmap=None):
+    """
+    Open the file 'filename' for reading its bytes, and close it on exit: the file is memory-mapped if 'use_mmap'
+    is True or, by default, if it has at least MMAP_MIN_SIZE bytes. A memory-mapped file is not copied into memory
+    as a whole, its pages are read by the operating system as they are accessed.
+
+    :return: an mmap.mmap or a binary file object
+    """
+    with open(filename, 'rb') as html_file:
+        size = os.fstat(html_file.fileno()).st_size
+        if use_mmap is None:
+            use_mmap = size >= MMAP_MIN_SIZE
+        if not use_mmap or size == 0:
+            yield html_file
+            return
+        with mmap.mmap(html_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def read_html(filename: str, use_mmap=None) -> str:
+    """
+    Return the decoded text of the html file 'filename', see open_html_file() and decode_html(). A memory-mapped
+    file is decoded without reading its bytes into memory first.
+    """
+    with open_html_file(filename, use_mmap) as html_file:
+        if isinstance(html_file, mmap.mmap):
+            return decode_html(html_file)
+        return decode_html(html_file.read())
+
+
+def detect_encoding(head: bytes, default=DEFAULT_ENCODING) -> str:
+    """
+    Return the encoding of html starting with the bytes 'head', without decoding them: the encoding of its
+    byte order mark, else the encoding in its XML declaration or in a <meta> charset within the first
+    ENCODING_SCAN_SIZE bytes, else 'default'. As in the HTML standard, a UTF-16 or UTF-32 encoding declared in
+    ascii bytes is taken to be UTF-8, and unknown encodings are ignored.
+    """
+    for byte_order_mark, encoding in BYTE_ORDER_MARKS:
+        if head.startswith(byte_order_mark):
+            return encoding
+    head = head[:ENCODING_SCAN_SIZE]
+    match = XML_DECLARATION_ENCODING.match(head) or META_CHARSET.search(head)
+    if match is None:
+        return default
+    try:
+        encoding = codecs.lookup(match.group(1).decode('ascii')).name
+    except LookupError:
+        return default
+    if encoding.startswith('utf-16') or encoding.startswith('utf-32'):
+        return 'utf-8'
+    return encoding
+
+
+def html_decoder(encoding: str):
+    """
+    Return an incremental decoder of html bytes in 'encoding': invalid bytes are replaced by U+FFFD, and newlines
+    are translated to '\\n' as when a file is read in text mode.
+    """
+    return io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(errors='replace'), translate=True)
+
+
+def decode_html(html, encoding=None) -> str:
+    """
+    Decode html bytes, or any bytes-like object, with 'encoding' or the encoding detected at their start, see
+    detect_encoding().
+    """
+    if encoding is None:
+        encoding = detect_encoding(html[:ENCODING_SCAN_SIZE])
+    return html_decoder(encoding).decode(html, final=True)
+
+
+def decode_chunks(chunks, encoding=None):
+    """
+    Decode html bytes read in 'chunks' like decode_html(), and yield the text of each chunk. The encoding is
+    detected at the start of the first chunks, up to ENCODING_SCAN_SIZE bytes.
+    """
+    chunks = iter(chunks)
+    head = b''
+    if encoding is None:
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= ENCODING_SCAN_SIZE:
+                break
+        encoding = detect_encoding(head)
+    decoder = html_decoder(encoding)
+    for chunk in itertools.chain([head], chunks):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def parse_segments(parser: ContentStreamParser, chunks):
+    """
+    Feed the html 'chunks' to 'parser' until the content element is closed, and yield the segments it ends.
+    """
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.pop_segments()
+        if parser.finished:
+            break
+    parser.close()
+    yield from parser.pop_segments()
+
+
+def tidy_segments(segments):
+    """
+    Tidy up the text of (segment id, text) pairs, see HtmlCleaner.iter_segments(): the start of each text
+    matching SEGMENT_GAP is added to the segment before it, segments without text are skipped.
+    """
+    segment_id = text = None
+    for next_id, next_text in segments:
+        gap = SEGMENT_GAP.match(next_text).end()
+        if text is not None:
+            text += next_text[:gap]
+        next_text = next_text[gap:]
+        if not next_text:
+            continue
+        if text is not None:
+            text = tidy_up_text_format(text)
+            if text:
+                yield segment_id, text
+        segment_id, text = next_id, next_text
+    if text is not None:
+        text = tidy_up_text_format(text)
+        if text:
+            yield segment_id, text
+
+
+def matches_attributes(attrs: list, wanted: dict) -> bool:
+    """
+    Check the (name, value) attributes of a start tag against 'wanted', as BeautifulSoup's find() does for
+    string and boolean values.
+    """
+    attrs = dict(attrs)
+    for name, value in wanted.items():
+        if value is True or value is False or value is None:
+            if (name in attrs) != bool(value):
+                return False
+        elif not attribute_matcher(name, value)(attrs.get(name)):
+            return False
+    return True
+
+
+def attribute_matcher(name: str, value: str):
+    """
+    Return a function checking the value of the attribute 'name' of an element for 'value', as BeautifulSoup's
+    find() does: the whole value must match, or one of the values of a multi-valued attribute like 'class'.
+    """
+    def matches(actual) -> bool:
+        if actual is None:
+            return False
+        if not isinstance(actual, str):
+            # a value already split by BeautifulSoup
+            return value in actual or value == ' '.join(actual)
+        return actual == value or (name in MULTI_VALUED_ATTRIBUTES and value in actual.split())
+    return matches
+
+
+def serialize_pattern(value) -> dict:
+    """
+    JSON serialization of the regular expressions in the configuration of HtmlCleaner, see fingerprint().
+    """
+    if isinstance(value, re.Pattern):
+        return {'pattern': value.pattern, 'flags': value.flags}
+    raise TypeError('{} can not be fingerprinted'.format(type(value).__name__))
+
+
+def content_hash(content: Union[str, bytes]) -> str:
+    """
+    Return the SHA-256 of html, a string is hashed in UTF-8.
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_hash(filename: str) -> str:
+    """
+    Return the SHA-256 of the bytes of a file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as html_file:
+        for chunk in iter(lambda: html_file.read(STREAM_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def tidy_up_text_format(text):
     """
     Removes duplicate punctuation marks, whitespaces or newlines.
+
+    Newlines and spaces are collapsed and consecutive punctuation marks removed in one scan of the text
+    (see TIDY_UP), URLs are then separated from their punctuation in one more, see clean_up_urls().
+    Both take linear time.
     """
     text = text.replace('\\s\n', '\n')
-    text = re.sub(r'\n+', '\n', text).strip()
-    text = re.sub(' +', ' ', text)
 
     # keep spaces before punctuation, otherwise we are creating unnecessary problems for tokenizer and normalizer
     # e.g. having a number in a table cell should not be turned into '10.' causing normalization to 'tenth', but
     # rather kepp the space: '10 .'
     #text = remove_whitespace_before_punctuation(text)
-    text = remove_consecutive_punct_marks(text)
+    text = TIDY_UP.sub(r'\1\2\3', text).strip()
     text = clean_up_urls(text)
 
     return text
@@ -141,31 +1103,248 @@ def remove_consecutive_punct_marks(text) -> str:
     return text
 
 
-def clean_up_urls(text):
-    # demarks a string starting with "http", "https" or "www." followed by any 
-    # string up untill a full-stop/comma, followed by one or more whitespace/newline.
-    return re.sub(r'(' + text_cleaner.URL_PATTERN + ')(.*)([.,])+([\s\n])', r'\1\2 \3 ', text)
+def clean_up_urls(text, at_start=True):
+    """
+    Separates URLs from the punctuation mark following them: a URL starts with "http", "https" or "www." at the
+    start of the text, and extends up to the last full-stop/comma on its line that is followed by a whitespace.
+    The punctuation mark and the whitespace are replaced by ' <punctuation mark> ', e.g. 'sjá http://mbl.is.\n'
+    becomes 'sjá http://mbl.is . '.
+
+    Only the first URL of each line can end at a punctuation mark, so each line is scanned at most once.
+
+    :param text: the text to clean up
+    :param at_start: if False, 'text' continues a longer text, a 'www' at its start is not at the start of the text
+    """
+    pieces = []
+    prev = 0
+    search_from = 0
+    if at_start and text.startswith('www'):
+        end_of_line = text.find('\n')
+        if end_of_line < 0:
+            end_of_line = len(text)
+        match = URL_END.match(text, len('www'), end_of_line + 1)
+        if match:
+            pieces.append(text[:match.start(1)] + ' ' + match.group(1) + ' ')
+            prev = match.end()
+            search_from = end_of_line + 1
+    while True:
+        url_start = text.find('http', search_from)
+        if url_start < 0:
+            break
+        end_of_line = text.find('\n', url_start)
+        if end_of_line < 0:
+            end_of_line = len(text)
+        match = URL_END.match(text, url_start + len('http'), end_of_line + 1)
+        if match:
+            pieces.append(text[prev:match.start(1)] + ' ' + match.group(1) + ' ')
+            prev = match.end()
+        search_from = end_of_line + 1
+    pieces.append(text[prev:])
+    return ''.join(pieces)
+
+
+class ConversionSummary(collections.namedtuple('ConversionSummary', ['converted', 'skipped', 'bytes', 'seconds'])):
+    """
+    Statistics of a run of clean_html_files(): the number of converted and skipped documents, the size of the
+    converted documents in bytes and the time of the whole run in seconds.
+    """
+    __slots__ = ()
+
+    @property
+    def throughput(self) -> float:
+        """
+        Megabytes of converted html per second.
+        """
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return 'converted {} files ({:.1f} MB) in {:.2f} s, {:.1f} MB/s, {} up to date'.format(
+            self.converted, self.bytes / 1e6, self.seconds, self.throughput, self.skipped)
+
+
+def find_html_files(inputs: list) -> list:
+    """
+    Collect the html documents of 'inputs': files, directories, searched recursively for files with one of the
+    HTML_EXTENSIONS, or glob patterns ('**' matches subdirectories). Each document is returned with its path
+    relative to its input: the path below the directory or below the part of the glob pattern without
+    wildcards, the file name for a file.
+
+    :return: a list of (path, relative path) pairs, sorted for each input
+    """
+    html_files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for dir_path, dir_names, file_names in os.walk(path):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    if file_name.lower().endswith(HTML_EXTENSIONS):
+                        file_path = os.path.join(dir_path, file_name)
+                        html_files.append((file_path, os.path.relpath(file_path, path)))
+        elif glob.escape(path) != path:
+            base = glob_base(path)
+            for file_path in sorted(glob.glob(path, recursive=True)):
+                if os.path.isfile(file_path):
+                    html_files.append((file_path, os.path.relpath(file_path, base)))
+        else:
+            html_files.append((path, os.path.basename(path)))
+    return html_files
+
+
+def glob_base(pattern: str) -> str:
+    """
+    Return the directories at the start of a glob pattern up to the first one containing a wildcard.
+    """
+    base = os.path.dirname(pattern)
+    while glob.escape(base) != base:
+        base = os.path.dirname(base)
+    return base
+
+
+def text_file_name(relative_path: str) -> str:
+    """
+    Return the name of the text output for an html document, its relative path with the extension '.txt'.
+    """
+    return os.path.splitext(relative_path)[0] + '.txt'
+
+
+def read_hashes(output_dir: str, fingerprint: str) -> dict:
+    """
+    Return the content hashes of the html documents converted into 'output_dir', by text file name,
+    see clean_html_files(). The hashes are discarded if they were written by another version of the package,
+    or for an HtmlCleaner with another configuration than the one with 'fingerprint', see HtmlCleaner.fingerprint().
+    Without a fingerprint, no hashes are kept.
+    """
+    try:
+        with open(os.path.join(output_dir, HASH_MANIFEST), encoding='utf-8') as manifest:
+            stored = json.load(manifest)
+    except (OSError, ValueError):
+        return {}
+    if fingerprint is None or stored.get('version') != cache.source_version() \
+            or stored.get('fingerprint') != fingerprint:
+        return {}
+    return stored.get('hashes', {})
+
+
+def write_hashes(output_dir: str, fingerprint: str, hashes: dict) -> None:
+    manifest_path = os.path.join(output_dir, HASH_MANIFEST)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as manifest:
+        json.dump({'version': cache.source_version(), 'fingerprint': fingerprint, 'hashes': hashes}, manifest,
+                  sort_keys=True, indent=0)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def clean_html_files(inputs: list, output_dir: str, html_cleaner=None, workers=None) -> ConversionSummary:
+    """
+    Extract the text of the html documents of 'inputs' (see find_html_files()) with HtmlCleaner.iter_clean_html()
+    and write it to 'output_dir', mirroring the directory tree of each input.
+
+    A document is skipped if its text file is up to date: the sha256 hash of each converted document is kept in
+    the file HASH_MANIFEST in 'output_dir', a text file is up to date if it is newer than its document and the
+    document has a hash in the manifest, or, if the document has been modified since (or only touched), if its
+    hash is still the same. All documents are converted again when the configuration of the HtmlCleaner changes.
+
+    :param html_cleaner: the HtmlCleaner to use, default is HtmlCleaner()
+    :param workers: number of worker processes, default is the number of CPUs. If 1, convert in this process
+    :return: the statistics of the run
+    :raises ValueError: if two documents would be written to the same text file, e.g. 'a/ch1.html' and
+        'b/ch1.html' given as files, or as the directories 'a' and 'b'
+    """
+    start = time.perf_counter()
+    html_cleaner = html_cleaner or HtmlCleaner()
+    html_paths = {}
+    for html_path, relative_path in find_html_files(inputs):
+        text_name = text_file_name(relative_path)
+        if text_name in html_paths and os.path.abspath(html_paths[text_name]) == os.path.abspath(html_path):
+            # the same document found by two inputs
+            continue
+        if text_name in html_paths:
+            raise ValueError("'{}' and '{}' would both be written to '{}'".format(html_paths[text_name], html_path,
+                                                                               os.path.join(output_dir, text_name)))
+        html_paths[text_name] = html_path
+    hashes = read_hashes(output_dir, html_cleaner.fingerprint())
+    tasks = [(html_path, os.path.join(output_dir, text_name), text_name, hashes.get(text_name))
+             for text_name, html_path in html_paths.items()]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    converted = skipped = size = 0
+    pool = None
+    try:
+        if workers <= 1:
+            results = (convert_html_file(html_cleaner, task) for task in tasks)
+        else:
+            pool = parallel.start_pool(workers, html_cleaner)
+            results = pool.imap_unordered(parallel.with_state(convert_html_file), tasks)
+        for text_name, html_hash, converted_bytes in results:
+            hashes[text_name] = html_hash
+            if converted_bytes is None:
+                skipped += 1
+            else:
+                converted += 1
+                size += converted_bytes
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if tasks:
+            write_hashes(output_dir, html_cleaner.fingerprint(), hashes)
+    return ConversionSummary(converted, skipped, size, time.perf_counter() - start)
+
+
+def convert_html_file(html_cleaner: HtmlCleaner, task: tuple) -> tuple:
+    """
+    Convert the html document of an (html path, text path, text file name, stored hash) task of clean_html_files()
+    with 'html_cleaner', unless the text file is up to date.
+
+    :return: (text file name, content hash, size of the html document in bytes or None if it was skipped)
+    """
+    html_path, text_path, text_name, stored_hash = task
+    if stored_hash is not None and os.path.exists(text_path) \
+            and os.path.getmtime(text_path) >= os.path.getmtime(html_path):
+        return text_name, stored_hash, None
+    with open(html_path, 'rb') as html_file:
+        content = html_file.read()
+    html_hash = content_hash(content)
+    if html_hash == stored_hash and os.path.exists(text_path):
+        # only touched: mark the text as up to date, the next run will not need to read the document
+        os.utime(text_path)
+        return text_name, html_hash, None
+    text = ''.join(html_cleaner.iter_clean_html(content))
+    os.makedirs(os.path.dirname(text_path) or '.', exist_ok=True)
+    # written under a temporary name first, an interrupted run does not leave a truncated text file behind
+    with open(text_path + '.tmp', 'w', encoding='utf-8') as text_file:
+        text_file.write(text)
+    os.replace(text_path + '.tmp', text_path)
+    return text_name, html_hash, len(content)
 
 
 def parse_arguments():
     parser = argparse.ArgumentParser()
-    parser.add_argument("html_doc", help="html document")
-    parser.add_argument("-w", "--write", default="", help="name of the file for the text output")
+    parser.add_argument("html_doc", nargs='+', help="html documents, directories or glob patterns")
+    parser.add_argument("-w", "--write", default="", help="name of the file for the text output of a single "
+                                                          "html document")
+    parser.add_argument("-o", "--output-dir", default="", help="directory for the text output, mirroring the "
+                                                               "directory tree of the input")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes")
     args = parser.parse_args()
+    if not args.output_dir and (len(args.html_doc) > 1 or not os.path.isfile(args.html_doc[0])):
+        parser.error("the output directory (-o) is required for several html documents, directories and globs")
 
     return args
 
 
 def main():
-        cmdline_args = parse_arguments()
-        html_doc = cmdline_args.html_doc
-        output_file = cmdline_args.write
-        cleaner = HtmlCleaner()
-        clean= cleaner.clean_html(
-            html=html_doc,
-            from_file=True)
-        with open(output_file, 'w') as f:
+    cmdline_args = parse_arguments()
+    if cmdline_args.output_dir:
+        summary = clean_html_files(cmdline_args.html_doc, cmdline_args.output_dir, workers=cmdline_args.jobs)
+        print(summary, file=sys.stderr)
+        return
+    cleaner = HtmlCleaner()
+    clean = cleaner.clean_html(
+        html=cmdline_args.html_doc[0],
+        from_file=True)
+    if cmdline_args.write:
+        with open(cmdline_args.write, 'w') as f:
             f.write(clean)
+    else:
+        print(clean)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,216 @@
+"""
+    Immutable configurations for TextCleaner, for services cleaning text with many slightly different settings.
+
+    A CleanerConfig holds the arguments of TextCleaner in frozen, hashable form. The large maps like
+    unicode_maps.replacement_dictionary are frozen once in a base configuration and shared by reference
+    between all configurations derived from it with with_overrides(), so a derived configuration only adds
+    its own small overrides. A ConfigRegistry compiles each configuration once into a TextCleaner: its
+    replacement dictionary is a ChainMap of the overrides on top of the shared base map, its character table
+    and fingerprint are computed once and shared by all cleaners of that configuration. The character table
+    only depends on the character rules (see CleanerConfig.char_rules()), configurations differing e.g. only
+    in 'preserve_strings' or the emoji handling share one table.
+
+    Example:
+        base = CleanerConfig.create(replacement_dict=unicode_maps.replacement_dictionary,
+                                    post_dict=unicode_maps.post_dict_lookup)
+        tenant = base.with_overrides(char_replacement={'æ': 'ae'}, preserve_strings=['π'])
+        cleaner = get_cleaner(tenant)
+"""
+import collections
+import collections.abc
+import copy
+
+from text_cleaner import cache
+from text_cleaner.clean import TextCleaner
+
+# number of compiled configurations kept by the default registry
+DEFAULT_REGISTRY_SIZE = 128
+# arguments of TextCleaner that are dictionaries, and those that are lists
+MAP_FIELDS = ('replacement_dict', 'post_dict', 'char_replacement')
+LIST_FIELDS = ('alphabet', 'punct_set', 'preserve_strings')
+
+
+class FrozenMap(collections.abc.Mapping):
+    """
+    An immutable, hashable copy of a dictionary. The hash is computed on first use and kept.
+    """
+    __slots__ = ('entries', 'hash_value')
+
+    def __init__(self, entries={}):
+        self.entries = dict(entries)
+        self.hash_value = None
+
+    def __getitem__(self, key):
+        return self.entries[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __hash__(self) -> int:
+        if self.hash_value is None:
+            self.hash_value = hash(frozenset(self.entries.items()))
+        return self.hash_value
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if isinstance(other, FrozenMap):
+            return hash(self) == hash(other) and self.entries == other.entries
+        return self.entries == other
+
+    def __repr__(self) -> str:
+        return 'FrozenMap(' + repr(self.entries) + ')'
+
+
+class CleanerConfig(collections.namedtuple('CleanerConfig', [
+        'replacement_dict', 'post_dict', 'char_replacement', 'punct_replacement', 'alphabet', 'punct_set',
+        'preserve_strings', 'emoji_replacement', 'preserve_emojis', 'describe_emojis',
+        'delete_labelled_translations'])):
+    """
+    The arguments of TextCleaner, frozen: dictionaries are FrozenMaps, lists are tuples. Create a configuration
+    with create() and derive others from it with with_overrides(), see the module docstring.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, replacement_dict={}, post_dict={}, char_replacement={}, punct_replacement='', alphabet=[],
+               punct_set=[], preserve_strings=[], emoji_replacement='.', preserve_emojis=False,
+               describe_emojis=False, delete_labelled_translations=False):
+        """
+        Create a configuration from the arguments of TextCleaner, which are documented there.
+        """
+        return cls(freeze_map(replacement_dict), freeze_map(post_dict), freeze_map(char_replacement),
+                   punct_replacement, tuple(alphabet), tuple(punct_set), tuple(preserve_strings),
+                   emoji_replacement, preserve_emojis, describe_emojis, delete_labelled_translations)
+
+    def with_overrides(self, **changes):
+        """
+        Return a copy of this configuration with the arguments in 'changes' replaced. The maps of this
+        configuration are shared, not copied. 'char_replacement' is added to the character replacements
+        of this configuration, all other arguments replace the current values.
+        """
+        for name in MAP_FIELDS:
+            if name in changes:
+                if name == 'char_replacement':
+                    changes[name] = dict(self.char_replacement, **changes[name])
+                changes[name] = freeze_map(changes[name])
+        for name in LIST_FIELDS:
+            if name in changes:
+                changes[name] = tuple(changes[name])
+        return self._replace(**changes)
+
+    def char_rules(self) -> tuple:
+        """
+        Return the part of the configuration the character table of TextCleaner depends on.
+        """
+        return (self.replacement_dict, self.post_dict, self.char_replacement, self.punct_replacement,
+                self.alphabet, self.punct_set)
+
+    def compile(self, shared=None) -> TextCleaner:
+        """
+        Compile the configuration into a TextCleaner with its character table, see the module docstring.
+        The replacement dictionary of this configuration is not copied.
+
+        :param shared: a compiled TextCleaner with the same char_rules(), its character table is reused
+        """
+        cleaner = TextCleaner(replacement_dict=collections.ChainMap({}, self.replacement_dict),
+                              post_dict=self.post_dict, char_replacement=dict(self.char_replacement),
+                              punct_replacement=self.punct_replacement, alphabet=self.alphabet,
+                              punct_set=self.punct_set, preserve_strings=self.preserve_strings,
+                              emoji_replacement=self.emoji_replacement, preserve_emojis=self.preserve_emojis,
+                              describe_emojis=self.describe_emojis,
+                              delete_labelled_translations=self.delete_labelled_translations)
+        if shared is None:
+            cleaner.compile_char_table()
+        else:
+            cleaner.replacement_dictionary = shared.replacement_dictionary
+            cleaner.char_table = shared.char_table
+            cleaner.replacement_values = shared.replacement_values
+            cleaner.chained_replacements = shared.chained_replacements
+        cleaner.fingerprint()
+        return cleaner
+
+
+class ConfigRegistry:
+    """
+    Compiled configurations, the least recently used ones are evicted when more than 'maxsize' configurations
+    are in use. The same holds for the character tables, which are shared by configurations with the same
+    character rules.
+    """
+
+    def __init__(self, maxsize=DEFAULT_REGISTRY_SIZE):
+        self.compiled = cache.LRUCache(maxsize)
+        self.char_tables = cache.LRUCache(maxsize)
+
+    def get(self, config: CleanerConfig) -> TextCleaner:
+        """
+        Return the compiled TextCleaner of 'config', compiling it if it is not in the registry. The returned
+        cleaner is shared, use cleaner() for a TextCleaner of your own.
+        """
+        compiled = self.compiled.get(config)
+        if compiled is None:
+            char_rules = config.char_rules()
+            compiled = config.compile(self.char_tables.get(char_rules))
+            self.char_tables.put(char_rules, compiled)
+            self.compiled.put(config, compiled)
+        return compiled
+
+    def cleaner(self, config: CleanerConfig, token_cache_size=0, result_cache=None) -> TextCleaner:
+        """
+        Return a new TextCleaner for 'config', sharing the compiled tables of the configuration. Changes to
+        the cleaner, e.g. with update_replacement_dictionary(), do not affect other cleaners.
+
+        :param token_cache_size: see TextCleaner
+        :param result_cache: see TextCleaner
+        """
+        compiled = self.get(config)
+        cleaner = copy.copy(compiled)
+        # updates of the replacement dictionary go to a map of the new cleaner's own
+        cleaner.replacement_dictionary = compiled.replacement_dictionary.new_child()
+        cleaner.token_cache = cache.LRUCache(token_cache_size) if token_cache_size > 0 else None
+        cleaner.result_cache = result_cache
+        cleaner.emoji_fast_path_count = 0
+        cleaner.emoji_scan_count = 0
+        return cleaner
+
+    def info(self) -> cache.CacheInfo:
+        return self.compiled.info()
+
+    def clear(self) -> None:
+        self.compiled.clear()
+        self.char_tables.clear()
+
+
+def freeze_map(entries) -> FrozenMap:
+    """
+    Return 'entries' as a FrozenMap, without copying if it already is one.
+    """
+    if isinstance(entries, FrozenMap):
+        return entries
+    return FrozenMap(entries)
+
+
+_default_registry = None
+
+
+def get_registry() -> ConfigRegistry:
+    """
+    Return the registry used by get_cleaner(), created on first use.
+    """
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ConfigRegistry()
+    return _default_registry
+
+
+def get_cleaner(config: CleanerConfig, token_cache_size=0, result_cache=None) -> TextCleaner:
+    """
+    Return a new TextCleaner for 'config' from the default registry, see ConfigRegistry.cleaner().
+    """
+    return get_registry().cleaner(config, token_cache_size=token_cache_size, result_cache=result_cache)
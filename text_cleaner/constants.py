@@ -15,6 +15,7 @@ html_closing_tag_replacement = {
     'table':'.',
     'tr':'.',
     'td':'.',
+    'th':'.',
     'span':'.',
     'strong':'.',
     'h1':'.',
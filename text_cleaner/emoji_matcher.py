@@ -0,0 +1,141 @@
+"""
+    Compiled matcher for the emoji sequences defined in emoji_dictionary.py.
+
+    All keys of EMOJI_PATTERN are merged into a codepoint trie, which is then written out as one regular
+    expression. Every node of the trie becomes a group of alternatives, nodes that end a key are made optional,
+    so that at each position the longest emoji sequence wins, e.g. 'thumbs up: medium skin tone' is matched as
+    a whole instead of as 'thumbs up' followed by a skin tone modifier. A lookahead on a coarse table of all
+    codepoints an emoji can start with lets the regex engine skip plain text without entering the trie.
+
+    Since most input text does not contain any emojis at all, the matcher also keeps the set of the first
+    non-ascii codepoint of every key. A text that contains none of these codepoints can not contain an emoji
+    and is returned unchanged without running the regex at all. Before that, may_contain_emoji() rules out
+    text without a codepoint of the emoji blocks of Unicode, without loading the emoji dictionary.
+"""
+import re
+
+# codepoints closer to each other than this are merged into one range of the start lookahead
+RANGE_GAP = 64
+# keycap sequences are the only emojis starting with an ascii character, e.g. '#️⃣'
+KEYCAP_START = r'[#*0-9]\ufe0f?\u20e3'
+# the blocks of Unicode containing the first non-ascii codepoint of every emoji: copyright and registered signs,
+# symbols and arrows up to the CJK symbols, the emoji variation selector and the pictographs
+EMOJI_BLOCKS = re.compile('[\u00a9\u00ae\u203c-\u3299\ufe0f\U0001f000-\U0001faff]')
+
+
+class EmojiMatcher:
+    """
+    Finds all emojis of a pattern dictionary in one left-to-right pass over the text, preferring
+    the longest sequence at each position.
+    """
+
+    def __init__(self, patterns: dict):
+        """
+        Prepares the matcher for the emoji sequences of 'patterns'.
+
+        :param patterns: a dictionary of emoji sequences and their descriptions
+        """
+        self.patterns = patterns
+        # every emoji contains at least one non-ascii codepoint (keycaps like '#️⃣' start with an ascii
+        # character), so the first non-ascii codepoint of each key is enough to rule out emojis in a text
+        self.required_codepoints = frozenset(next((char for char in key if ord(char) > 127), key[0])
+                                             for key in patterns)
+        # compiled on first use, see compile()
+        self.regex = None
+
+    def compile(self) -> None:
+        """
+        Compile the emoji sequences into one regular expression, see the module docstring.
+        """
+        start_ranges = codepoint_ranges([key[0] for key in self.patterns if ord(key[0]) > 127], RANGE_GAP)
+        start_class = '[' + ''.join(re.escape(chr(low)) if low == high
+                                    else re.escape(chr(low)) + '-' + re.escape(chr(high))
+                                    for low, high in start_ranges) + ']'
+        self.regex = re.compile('(?=' + KEYCAP_START + '|' + start_class + ')'
+                                + trie_to_regex(build_trie(self.patterns)))
+
+    def may_contain_emoji(self, text: str) -> bool:
+        """
+        Fast check for emoji-free text: return False if 'text' contains none of the codepoints required
+        to build an emoji. A return value of True does not guarantee that the text contains an emoji.
+        """
+        return not self.required_codepoints.isdisjoint(text)
+
+    def sub(self, repl, text: str) -> str:
+        """
+        Replace each emoji in 'text' by the return value of 'repl', called with the match object of the emoji.
+        """
+        if self.regex is None:
+            self.compile()
+        return self.regex.sub(repl, text)
+
+
+def build_trie(keys) -> dict:
+    """
+    Build a codepoint trie of 'keys'. Each node is a dictionary of characters and their child nodes,
+    the empty string as a key marks the end of a key.
+    """
+    root = {}
+    for key in keys:
+        node = root
+        for char in key:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return root
+
+
+def trie_to_regex(node: dict) -> str:
+    """
+    Convert a trie as returned by build_trie() into a regular expression matching the longest key.
+    """
+    alternatives = [re.escape(char) + trie_to_regex(child) for char, child in sorted(node.items()) if char]
+    pattern = '|'.join(alternatives)
+    if '' in node:
+        # a key ends here, continuing is optional. The '?' is greedy, so longer keys are preferred
+        return '(?:' + pattern + ')?' if alternatives else ''
+    if len(alternatives) > 1:
+        return '(?:' + pattern + ')'
+    return pattern
+
+
+def codepoint_ranges(chars, gap=1) -> list:
+    """
+    Sort the codepoints of 'chars' into a list of (low, high) ranges. Codepoints closer than 'gap' to the
+    previous range are added to that range.
+    """
+    ranges = []
+    for codepoint in sorted(set(ord(char) for char in chars)):
+        if ranges and codepoint - ranges[-1][1] <= gap:
+            ranges[-1][1] = codepoint
+        else:
+            ranges.append([codepoint, codepoint])
+    return [tuple(codepoint_range) for codepoint_range in ranges]
+
+
+def may_contain_emoji(text: str) -> bool:
+    """
+    Coarse check for emoji-free text, without loading the emoji dictionary: return False if 'text' contains no
+    codepoint of EMOJI_BLOCKS, see also EmojiMatcher.may_contain_emoji().
+    """
+    return EMOJI_BLOCKS.search(text) is not None
+
+
+_default_matcher = None
+
+
+def get_emoji_patterns() -> dict:
+    """
+    Return emoji_dictionary.EMOJI_PATTERN. The emoji dictionary is large, it is only imported on first use.
+    """
+    from text_cleaner import emoji_dictionary
+    return emoji_dictionary.EMOJI_PATTERN
+
+
+def get_default_matcher() -> EmojiMatcher:
+    """
+    Return the matcher for emoji_dictionary.EMOJI_PATTERN, it is compiled once on first use.
+    """
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = EmojiMatcher(get_emoji_patterns())
+    return _default_matcher
@@ -0,0 +1,182 @@
+"""
+    Cleans EPUB books: the XHTML documents of the book are read from the .epub zip file in the reading order
+    given by the spine of the package document (OPF), and each one is extracted with HtmlCleaner and,
+    optionally, cleaned with TextCleaner. The documents are processed in a pool of worker processes.
+
+    If the HtmlCleaner has a result cache, the extracted texts of the documents are looked up in it by the hash
+    of their html, and only the documents not found are extracted, e.g. the changed chapters of a new edition.
+"""
+import argparse
+import copy
+import os
+import posixpath
+import sys
+import urllib.parse
+import xml.etree.ElementTree as ElementTree
+import zipfile
+
+from text_cleaner import parallel
+from text_cleaner.clean_html import HtmlCleaner, content_hash
+
+CONTAINER_PATH = 'META-INF/container.xml'
+HTML_MEDIA_TYPES = {'application/xhtml+xml', 'text/html'}
+
+
+class EpubCleaner:
+    """
+    Extracts and cleans the text of the XHTML documents of an EPUB book, in spine order.
+    """
+
+    def __init__(self, html_cleaner=None, text_cleaner=None, workers=None):
+        """
+        :param html_cleaner: the HtmlCleaner extracting the text of each document, default is HtmlCleaner()
+        :param text_cleaner: if given, a TextCleaner cleaning the extracted text of each document
+        :param workers: number of worker processes, default is the number of CPUs. If 1, clean in this process.
+                        Each worker process gets a copy of the cleaners
+        """
+        self.html_cleaner = html_cleaner or HtmlCleaner()
+        self.text_cleaner = text_cleaner
+        self.workers = workers
+
+    @staticmethod
+    def spine(epub_path: str) -> list:
+        """
+        Return the names of the XHTML documents in the zip file 'epub_path', in the order of the spine.
+        """
+        with zipfile.ZipFile(epub_path) as epub:
+            return read_spine(epub)
+
+    def iter_documents(self, epub_path: str):
+        """
+        Extract and clean each XHTML document of the book 'epub_path', see HtmlCleaner.iter_clean_html():
+        documents without the content element of the HtmlCleaner give an empty text.
+
+        :return: a generator of (document name, text) pairs, in spine order
+        """
+        names = self.spine(epub_path)
+        html_cleaner = self.html_cleaner
+        if not html_cleaner.uses_result_cache():
+            keys = extracted = [None] * len(names)
+        else:
+            keys = document_keys(html_cleaner, epub_path, names)
+            extracted = html_cleaner.result_cache.get_many(keys)
+            # the cache is looked up and updated in this process only
+            html_cleaner = copy.copy(html_cleaner)
+            html_cleaner.result_cache = None
+        tasks = [(epub_path, name, text) for name, text in zip(names, extracted)]
+        workers = min(self.workers or os.cpu_count() or 1, len(tasks))
+        if workers <= 1:
+            results = (clean_document((html_cleaner, self.text_cleaner), task) for task in tasks)
+            yield from self.store_results(names, keys, extracted, results)
+            return
+        with parallel.start_pool(workers, (html_cleaner, self.text_cleaner)) as pool:
+            yield from self.store_results(names, keys, extracted,
+                                          pool.imap(parallel.with_state(clean_document), tasks))
+
+    def store_results(self, names: list, keys: list, cached: list, results):
+        """
+        Store the texts extracted from the documents not found in the result cache, and yield the (document name,
+        text) pairs of iter_documents().
+        """
+        for name, key, cached_text, (extracted, text) in zip(names, keys, cached, results):
+            if key is not None and cached_text is None:
+                self.html_cleaner.result_cache.put(key, extracted)
+            yield name, text
+
+    def clean_epub(self, epub_path: str) -> str:
+        """
+        Return the text of the book 'epub_path', the non-empty texts of its documents joined by newlines.
+        """
+        return '\n'.join(text for name, text in self.iter_documents(epub_path) if text)
+
+
+def read_spine(epub: zipfile.ZipFile) -> list:
+    """
+    Find the package document of 'epub' through META-INF/container.xml and return the names of the XHTML documents
+    listed in its spine, in spine order.
+
+    :raises ValueError: if the container does not name a package document
+    """
+    container = ElementTree.fromstring(epub.read(CONTAINER_PATH))
+    rootfile = next((elem for elem in container.iter()
+                     if local_name(elem.tag) == 'rootfile' and elem.get('full-path')), None)
+    if rootfile is None:
+        raise ValueError('no rootfile in ' + CONTAINER_PATH)
+    opf_path = rootfile.get('full-path')
+    package = ElementTree.fromstring(epub.read(opf_path))
+    manifest = {}
+    for item in package.iter():
+        if local_name(item.tag) == 'item' and item.get('media-type') in HTML_MEDIA_TYPES:
+            href = urllib.parse.unquote(item.get('href').split('#')[0])
+            manifest[item.get('id')] = posixpath.normpath(posixpath.join(posixpath.dirname(opf_path), href))
+    return [manifest[itemref.get('idref')] for itemref in package.iter()
+            if local_name(itemref.tag) == 'itemref' and itemref.get('idref') in manifest]
+
+
+def document_keys(html_cleaner: HtmlCleaner, epub_path: str, names: list) -> list:
+    """
+    Return the keys of the documents 'names' of the epub in the result cache of 'html_cleaner', see
+    HtmlCleaner.cache_key().
+    """
+    with zipfile.ZipFile(epub_path) as epub:
+        return [html_cleaner.cache_key(content_hash(epub.read(name))) for name in names]
+
+
+def local_name(tag: str) -> str:
+    """
+    Return an ElementTree tag without its namespace.
+    """
+    return tag.rsplit('}', 1)[-1]
+
+
+def clean_document(cleaners: tuple, task: tuple) -> tuple:
+    """
+    Extract and clean the document of an (epub path, document name, extracted text) task with the (html cleaner,
+    text cleaner) pair 'cleaners', see extract_document(). In a worker process, the document is read from the epub
+    in the worker, so only the names are sent to the workers.
+    """
+    return extract_document(*cleaners, *task)
+
+
+def extract_document(html_cleaner, text_cleaner, epub_path: str, name: str, extracted=None) -> tuple:
+    """
+    Read the document 'name' from the epub and extract its text with 'html_cleaner', cleaned with 'text_cleaner'
+    if it is not None.
+
+    :param extracted: the text already extracted from the document, e.g. found in a result cache, if not None
+    :return: the extracted text and the cleaned text
+    """
+    if extracted is None:
+        with zipfile.ZipFile(epub_path) as epub:
+            html = epub.read(name)
+        extracted = ''.join(html_cleaner.iter_clean_html(html))
+    text = extracted
+    if text_cleaner is not None:
+        text = text_cleaner.clean(text)
+    return extracted, text
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('epub', help="epub file")
+    parser.add_argument('--clean', '-c', action='store_true', help="Clean the extracted text with TextCleaner")
+    parser.add_argument('--jobs', '-j', type=int, default=None, help="Number of worker processes")
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    args = parse_arguments()
+    text_cleaner = None
+    if args.clean:
+        from text_cleaner.clean import TextCleaner
+        text_cleaner = TextCleaner()
+    epub_cleaner = EpubCleaner(text_cleaner=text_cleaner, workers=args.jobs)
+    for name, text in epub_cleaner.iter_documents(args.epub):
+        if text:
+            sys.stdout.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+    Pools of worker processes sharing a state, e.g. the cleaners, for clean.clean_parallel(),
+    clean_html.clean_html_files() and epub.EpubCleaner: the state is sent to each worker process once, when the
+    process starts, and the tasks of the pool are called with the state of their worker process.
+
+    Example:
+        with start_pool(4, cleaner) as pool:
+            results = pool.imap(with_state(clean_task), tasks)
+"""
+import functools
+
+# the state of a worker process, see init_worker()
+worker_state = None
+
+
+def start_pool(processes: int, state):
+    """
+    Start a multiprocessing.Pool of 'processes' worker processes, each one with a copy of 'state'.
+    Tasks get the state with with_state().
+    """
+    # imported here, only needed when working in parallel
+    import multiprocessing
+    return multiprocessing.Pool(processes, initializer=init_worker, initargs=(state,))
+
+
+def init_worker(state) -> None:
+    """
+    Pool initializer of start_pool(): keep the state of the worker process.
+    """
+    global worker_state
+    worker_state = state
+
+
+def with_state(function):
+    """
+    Return a task for a pool of start_pool(): called with an argument in a worker process, it returns
+    function(state, argument) with the state of the process.
+    """
+    return functools.partial(call_with_state, function)
+
+
+def call_with_state(function, argument):
+    return function(worker_state, argument)
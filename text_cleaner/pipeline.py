@@ -0,0 +1,72 @@
+"""
+    Extracts and cleans the text of html documents in one pass: the text extracted by
+    HtmlCleaner.iter_clean_html() is passed on in pieces to TextCleaner.iter_clean(), which tokenizes and cleans
+    it as it comes. Neither the extracted text nor the cleaned text of the whole document is held in memory,
+    unless it is asked for with CleaningPipeline.clean().
+
+    Example:
+        pipeline = CleaningPipeline(text_cleaner=TextCleaner(replacement_dict=unicode_maps.replacement_dictionary))
+        with open('chapter.txt', 'w') as out:
+            for text in pipeline.iter_clean('chapter.html', from_file=True):
+                out.write(text)
+"""
+from text_cleaner.clean import TextCleaner
+from text_cleaner.clean_html import HtmlCleaner, SEGMENT_ATTRS, STREAM_CHUNK_SIZE
+
+
+class CleaningPipeline:
+    """
+    An HtmlCleaner and a TextCleaner, the text extracted by the one streamed into the other.
+    """
+
+    def __init__(self, html_cleaner=None, text_cleaner=None):
+        """
+        :param html_cleaner: the HtmlCleaner extracting the text, default is HtmlCleaner()
+        :param text_cleaner: the TextCleaner cleaning the extracted text, default is TextCleaner()
+        """
+        self.html_cleaner = html_cleaner or HtmlCleaner()
+        self.text_cleaner = text_cleaner or TextCleaner()
+
+    def iter_clean(self, html, from_file=False, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Extract the text of the content element of 'html' and clean it, see HtmlCleaner.iter_clean_html() and
+        TextCleaner.iter_clean(). Joined, the yielded strings are the same as TextCleaner.clean() of the text
+        returned by HtmlCleaner.clean_html(html, from_file=True).
+
+        :param html: an html string, filename or file object
+        :param from_file: if True, 'html' is a filename
+        :param chunk_size: number of characters of html to parse at a time
+        :return: a generator of the cleaned text, in pieces
+        """
+        return self.text_cleaner.iter_clean(self.html_cleaner.iter_clean_html(html, from_file, chunk_size))
+
+    def clean(self, html, from_file=False) -> str:
+        """
+        Return the cleaned text of 'html', see iter_clean(). The cleaned text is the only copy of the whole
+        text made.
+        """
+        return ''.join(self.iter_clean(html, from_file))
+
+    def iter_sentences(self, html, from_file=False, min_clause_words=None, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Same as iter_clean(), but the cleaned text is yielded in sentences, each one as soon as its end is known,
+        see TextCleaner.iter_sentences(). Unlike iter_segments(), the html does not need to mark the sentences.
+
+        :param min_clause_words: if given, also yield clauses of at least this many words
+        :return: a generator of the cleaned sentences
+        """
+        return self.text_cleaner.iter_sentences(self.html_cleaner.iter_clean_html(html, from_file, chunk_size),
+                                                min_clause_words)
+
+    def iter_segments(self, html, from_file=False, segment_attrs=SEGMENT_ATTRS, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Extract the text of the segments of 'html', by default its sentences, see HtmlCleaner.iter_segments(), and
+        clean the text of each one with TextCleaner.clean(). Segments are yielded as soon as they are closed in
+        the html, segments without cleaned text are skipped.
+
+        :return: a generator of (segment id, cleaned text) pairs, in document order
+        """
+        for segment_id, text in self.html_cleaner.iter_segments(html, from_file, segment_attrs, chunk_size):
+            text = self.text_cleaner.clean(text)
+            if text:
+                yield segment_id, text